@@ -0,0 +1,202 @@
+import asyncio
+import os
+import signal
+import time
+
+import websockets
+
+from deadline import deadline_scope
+from group_store import ProcessedGroupStore, group_key
+from java_delivery import JavaDelivery
+from metrics import metrics, start_metrics_server, start_summary_logger
+from shard import ShardMembership
+from venue_manager import AsyncVenueManager
+from json_stream import iter_json_array
+from stomp_codec import StompDecoder, StompError
+from worker import WS_URI, JAVA_API_URL, build_event_payload, check_config, group_category, stomp_frame
+
+# How many groups may be waiting on the network at once (one event loop, no extra threads).
+ASYNC_WORKER_CONCURRENCY = int(os.getenv("ASYNC_WORKER_CONCURRENCY", "200"))
+
+
+class AsyncRadarWorker:
+    """
+    asyncio version of RadarWorker: STOMP over an async websocket and
+    awaited geocoding / OpenAI calls. Events go through the same JavaDelivery
+    as in the threaded worker (batching, retries, spool), and dedupe, fallback
+    venue and payload shape are the same too. Disk I/O runs in asyncio.to_thread.
+    """
+
+    def __init__(self, concurrency=ASYNC_WORKER_CONCURRENCY):
+        self.uri = WS_URI
+        self.running = True
+        self.shard = ShardMembership()
+        self.group_store = ProcessedGroupStore()
+        self.delivery = JavaDelivery(url=JAVA_API_URL)
+
+        self.concurrency = concurrency
+        self.slots = asyncio.Semaphore(concurrency)
+        self.tasks = set()
+
+        self.venues = None
+        self.loop = None
+        self._consumer = None
+
+    def stop(self):
+        """Stop reading the websocket; run() then finishes in-flight groups and stops delivery, spooling the rest."""
+        self.running = False
+        if self._consumer is not None:
+            self._consumer.cancel()
+
+    async def run(self):
+        self.loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                self.loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass  # Windows: Ctrl+C cancels run() instead, the finally blocks still clean up
+        self.shard.on_takeover = self._take_over_groups
+        start_metrics_server()
+        start_summary_logger()
+        metrics.gauge("in_flight", lambda: len(self.tasks), pool="async")
+        self.shard.start()
+        metrics.gauge("shards_live", lambda: len(self.shard.live))
+        try:
+            # Replays the spool from disk before the senders start.
+            await asyncio.to_thread(self.delivery.start)
+            async with AsyncVenueManager() as venues:
+                self.venues = venues
+                print(f" [WORKER] Starting (async, concurrency={self.concurrency})... Connecting to {self.uri}")
+                self._consumer = asyncio.create_task(self._consume_loop())
+                try:
+                    await self._consumer
+                except asyncio.CancelledError:
+                    if self.running:
+                        raise  # run() itself was cancelled, not stopped
+                finally:
+                    # Groups already taken off the socket still get their venue and event.
+                    if self.tasks:
+                        await asyncio.gather(*self.tasks, return_exceptions=True)
+        finally:
+            print(" [WORKER] Stopping...")
+            await asyncio.to_thread(self.delivery.stop)
+            await asyncio.to_thread(self.group_store.close)
+            self.shard.stop()
+
+    async def _consume_loop(self):
+        while self.running:
+            try:
+                await self._consume()
+            except Exception as e:
+                print(f" [WS] Connection error: {e}")
+
+            if self.running:
+                print(" [WS] Reconnecting in 3s...")
+                await asyncio.sleep(3)
+
+    async def _consume(self):
+        async with websockets.connect(self.uri) as ws:
+            print(" [WS] Connected.")
+            await ws.send(stomp_frame("CONNECT", headers={"accept-version":"1.1,1.2", "host":"localhost"}))
+            await ws.send(stomp_frame("SUBSCRIBE", headers={"id":"sub-0", "destination":"/topic/groups"}))
+
+            decoder = StompDecoder()
+            async for message in ws:
+                await self.on_message(decoder, message)
+
+        print(" [WS] Disconnected.")
+
+    async def on_message(self, decoder, message):
+        try:
+            frames = decoder.feed(message)
+        except StompError as e:
+            print(f" [WS] Dropping malformed STOMP data: {e}")
+            return
+
+        for frame in frames:
+            if frame.command == "ERROR":
+                print(f" [WS] Broker error: {frame.headers.get('message', '')} {frame.text[:200]}")
+            elif frame.command == "MESSAGE" and frame.body.strip():
+                await self.process_incoming_data(frame.body)
+
+    async def process_incoming_data(self, json_body):
+        count = 0
+        try:
+            for group in iter_json_array(json_body):
+                if not isinstance(group, dict):
+                    metrics.inc("groups_total", result="invalid")
+                    continue
+                if not self.shard.owns(group.get('groupId')):
+                    metrics.inc("groups_total", result="other_shard")
+                    self.shard.hold(group)
+                    continue
+                await self.spawn_group(group)
+                count += 1
+        except ValueError as e:
+            print(f" [LOGIC] Error processing message after {count} group(s): {e}")
+
+    async def spawn_group(self, group):
+        # Waiting for a free slot here stops reading the socket - backpressure.
+        await self.slots.acquire()
+        task = asyncio.create_task(self.process_group(group))
+        self.tasks.add(task)
+        task.add_done_callback(self._task_done)
+
+    def _take_over_groups(self, groups):
+        # Called on the shard lease thread.
+        async def _spawn_all():
+            for group in groups:
+                metrics.inc("groups_total", result="taken_over")
+                await self.spawn_group(group)
+
+        asyncio.run_coroutine_threadsafe(_spawn_all(), self.loop)
+
+    def _task_done(self, task):
+        self.tasks.discard(task)
+        self.slots.release()
+
+    async def process_group(self, group):
+        g_id = group.get('groupId')
+        key = group_key(group)
+
+        if not self.group_store.claim(key):
+            return
+
+        started = time.perf_counter()
+        try:
+            print(f"\n [WORKER] Processing Group ID: {g_id}")
+
+            lat = group.get('latitude')
+            lng = group.get('longitude')
+
+            if lat is None or lng is None:
+                print(" Skipping group without location.")
+                return
+
+            with deadline_scope():
+                venue_result = await self.venues.find_venue(lat, lng, group_category(group))
+            await self.send_to_java(build_event_payload(group, venue_result))
+
+            await asyncio.to_thread(self.group_store.mark_done, key)
+
+        except Exception as e:
+            print(f" [LOGIC] Error processing group {g_id}: {e}")
+            metrics.inc("errors_total", stage="group")
+        finally:
+            metrics.observe("group_seconds", time.perf_counter() - started)
+            self.group_store.release(key)
+
+    async def send_to_java(self, payload):
+        # Delivery retries and spools on its own; send() only blocks while its queue is full.
+        print(f" [HTTP] Queueing Event {payload['eventId']} for Java...")
+        await asyncio.to_thread(self.delivery.send, payload)
+
+
+if __name__ == "__main__":
+    check_config()
+    worker = AsyncRadarWorker()
+
+    try:
+        asyncio.run(worker.run())
+    except KeyboardInterrupt:
+        print("Stopping worker...")
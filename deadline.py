@@ -0,0 +1,54 @@
+import contextvars
+import math
+import os
+import time
+from contextlib import contextmanager
+
+# Seconds a group may spend on venue lookup before it gets the default venue.
+GROUP_DEADLINE = float(os.getenv("GROUP_DEADLINE", "20"))
+
+
+class DeadlineExceeded(TimeoutError):
+    pass
+
+
+class Deadline:
+    """Absolute point in time (monotonic) by which the current unit of work must finish."""
+
+    def __init__(self, seconds=None):
+        self.expires_at = time.monotonic() + seconds if seconds else math.inf
+
+    def remaining(self):
+        """Seconds left, or None when there is no deadline (usable directly as a timeout=)."""
+        if self.expires_at == math.inf:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self):
+        return time.monotonic() >= self.expires_at
+
+    def timeout(self, cap):
+        """Per-call timeout: `cap`, shortened to what is left. Raises DeadlineExceeded when nothing is."""
+        remaining = self.expires_at - time.monotonic()
+        if remaining <= 0:
+            raise DeadlineExceeded("group deadline exceeded")
+        return min(cap, remaining)
+
+
+_NO_DEADLINE = Deadline()
+# A ContextVar follows asyncio tasks; thread pools need contextvars.copy_context().run.
+_current = contextvars.ContextVar("deadline", default=_NO_DEADLINE)
+
+
+def current_deadline():
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(seconds=GROUP_DEADLINE):
+    deadline = Deadline(seconds)
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
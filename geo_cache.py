@@ -0,0 +1,148 @@
+import os
+import re
+import threading
+import unicodedata
+
+import geohash
+from shard import shard_local
+from ttl_cache import TTLCache
+
+REVERSE_CACHE_PRECISION = int(os.getenv("REVERSE_CACHE_PRECISION", "7"))
+REVERSE_CACHE_RADIUS_M = float(os.getenv("REVERSE_CACHE_RADIUS_M", "75"))
+REVERSE_CACHE_TTL = float(os.getenv("REVERSE_CACHE_TTL", str(30 * 24 * 3600)))
+REVERSE_CACHE_MAX = int(os.getenv("REVERSE_CACHE_MAX", "20000"))
+REVERSE_CACHE_PATH = shard_local(os.getenv("REVERSE_CACHE_PATH", "reverse_geocode.cache.json"))
+
+FORWARD_CACHE_TTL = float(os.getenv("FORWARD_CACHE_TTL", str(30 * 24 * 3600)))
+FORWARD_CACHE_NEGATIVE_TTL = float(os.getenv("FORWARD_CACHE_NEGATIVE_TTL", str(24 * 3600)))
+FORWARD_CACHE_MAX = int(os.getenv("FORWARD_CACHE_MAX", "20000"))
+FORWARD_CACHE_PATH = shard_local(os.getenv("FORWARD_CACHE_PATH", "forward_geocode.cache.json"))
+
+# Returned by ForwardGeocodeCache.lookup() when the name has never been seen.
+NOT_CACHED = object()
+
+# Points kept per geohash cell; enough for a few distinct streets in one cell.
+_POINTS_PER_CELL = 8
+
+
+class ReverseGeocodeCache:
+    """
+    Spatially quantized cache for reverse geocoding.
+
+    Points are bucketed by geohash cell; a lookup scans the cell and its 8
+    neighbours and returns the address of the nearest cached point within
+    `radius_m`. Keep radius_m below the narrowest side of a `precision` cell
+    so the 3x3 block always covers the whole radius: precision 7 cells are
+    ~153 m tall but only ~153 m * cos(lat) wide, ~94 m in Poland (52 N).
+    A hit refreshes the cell's LRU position.
+    """
+
+    def __init__(
+        self,
+        precision=REVERSE_CACHE_PRECISION,
+        radius_m=REVERSE_CACHE_RADIUS_M,
+        ttl=REVERSE_CACHE_TTL,
+        max_cells=REVERSE_CACHE_MAX,
+        path=REVERSE_CACHE_PATH,
+    ):
+        self.precision = precision
+        self.radius_m = radius_m
+        self.cells = TTLCache(max_entries=max_cells, ttl=ttl, path=path, name="reverse-cache")
+        self._write_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, lat, lng):
+        best = best_cell = None
+        best_dist = self.radius_m
+        for cell in geohash.neighbours(geohash.encode(lat, lng, self.precision)):
+            for p_lat, p_lng, address in self.cells.peek(cell, ()):
+                dist = geohash.distance_m(lat, lng, p_lat, p_lng)
+                if dist <= best_dist:
+                    best, best_cell, best_dist = address, cell, dist
+
+        if best is not None:
+            self.cells.touch(best_cell)
+        with self._stats_lock:
+            if best is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return best
+
+    def put(self, lat, lng, address):
+        cell = geohash.encode(lat, lng, self.precision)
+        with self._write_lock:
+            points = [p for p in self.cells.peek(cell, ()) if (p[0], p[1]) != (lat, lng)]
+            points.append([lat, lng, address])
+            self.cells.put(cell, points[-_POINTS_PER_CELL:])
+
+    def prewarm(self, coords, resolve):
+        """
+        Fill the cache for every (lat, lng) in `coords` not already covered,
+        using resolve(lat, lng) -> address or None. Returns how many were resolved.
+        """
+        resolved = 0
+        for lat, lng in coords:
+            if self.lookup(lat, lng) is not None:
+                continue
+            address = resolve(lat, lng)
+            if address:
+                self.put(lat, lng, address)
+                resolved += 1
+        self.cells.save()
+        return resolved
+
+    def stats(self):
+        with self._stats_lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "cells": len(self.cells),
+            "hits": hits,
+            "misses": misses,
+            "evictions": self.cells.evictions,
+            "hit_ratio": round(hits / lookups, 4) if lookups else 0.0,
+        }
+
+
+def normalize_place_name(name):
+    """'  "Rynek Główny,  Kraków." ' -> 'rynek główny, kraków'"""
+    name = unicodedata.normalize("NFKC", name or "").lower()
+    name = re.sub(r"\s+", " ", name)
+    name = re.sub(r"\s*,\s*", ", ", name)
+    return name.strip(" \t\"'`.„”“")
+
+
+class ForwardGeocodeCache:
+    """
+    Normalized place name -> {"lat", "lng", "address"} cache for forward geocoding.
+    Names Photon could not resolve are cached as None for a shorter `negative_ttl`.
+    """
+
+    def __init__(
+        self,
+        ttl=FORWARD_CACHE_TTL,
+        negative_ttl=FORWARD_CACHE_NEGATIVE_TTL,
+        max_entries=FORWARD_CACHE_MAX,
+        path=FORWARD_CACHE_PATH,
+    ):
+        self.negative_ttl = negative_ttl
+        self.names = TTLCache(max_entries=max_entries, ttl=ttl, path=path, name="forward-cache")
+
+    def lookup(self, place_name):
+        """Cached location dict, None for a known-bad name, or NOT_CACHED."""
+        value = self.names.get(normalize_place_name(place_name), NOT_CACHED)
+        if isinstance(value, dict):
+            return dict(value)
+        return value
+
+    def put(self, place_name, location):
+        self.names.put(normalize_place_name(place_name), dict(location))
+
+    def put_missing(self, place_name):
+        self.names.put(normalize_place_name(place_name), None, ttl=self.negative_ttl)
+
+    def stats(self):
+        return self.names.stats()
@@ -0,0 +1,106 @@
+import math
+
+_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+_DECODE = {c: i for i, c in enumerate(_BASE32)}
+
+
+def encode(lat, lng, precision=6):
+    """Standard base32 geohash of (lat, lng) with `precision` characters."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(chars) < precision:
+        if even:
+            mid = (lng_lo + lng_hi) / 2
+            if lng >= mid:
+                bits = (bits << 1) | 1
+                lng_lo = mid
+            else:
+                bits <<= 1
+                lng_hi = mid
+        else:
+            mid = (lat_lo + lat_hi) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_lo = mid
+            else:
+                bits <<= 1
+                lat_hi = mid
+        even = not even
+        bit_count += 1
+
+        if bit_count == 5:
+            chars.append(_BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(chars)
+
+
+def decode_bbox(cell):
+    """(lat_lo, lat_hi, lng_lo, lng_hi) of a geohash cell."""
+    lat_lo, lat_hi = -90.0, 90.0
+    lng_lo, lng_hi = -180.0, 180.0
+    even = True
+
+    for c in cell:
+        value = _DECODE[c]
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            if even:
+                mid = (lng_lo + lng_hi) / 2
+                if bit:
+                    lng_lo = mid
+                else:
+                    lng_hi = mid
+            else:
+                mid = (lat_lo + lat_hi) / 2
+                if bit:
+                    lat_lo = mid
+                else:
+                    lat_hi = mid
+            even = not even
+
+    return lat_lo, lat_hi, lng_lo, lng_hi
+
+
+def decode(cell):
+    """Centre (lat, lng) of a geohash cell."""
+    lat_lo, lat_hi, lng_lo, lng_hi = decode_bbox(cell)
+    return (lat_lo + lat_hi) / 2, (lng_lo + lng_hi) / 2
+
+
+def neighbours(cell):
+    """The cell itself plus its 8 surrounding cells of the same precision."""
+    lat_lo, lat_hi, lng_lo, lng_hi = decode_bbox(cell)
+    d_lat = lat_hi - lat_lo
+    d_lng = lng_hi - lng_lo
+    lat_c = (lat_lo + lat_hi) / 2
+    lng_c = (lng_lo + lng_hi) / 2
+
+    cells = []
+    for dy in (-1, 0, 1):
+        lat = lat_c + dy * d_lat
+        if not -90.0 <= lat <= 90.0:
+            continue
+        for dx in (-1, 0, 1):
+            lng = (lng_c + dx * d_lng + 180.0) % 360.0 - 180.0
+            neighbour = encode(lat, lng, len(cell))
+            if neighbour not in cells:
+                cells.append(neighbour)
+    return cells
+
+
+def distance_m(lat1, lng1, lat2, lng2):
+    """Great-circle (haversine) distance in metres."""
+    r = 6371000.0
+    p1 = math.radians(lat1)
+    p2 = math.radians(lat2)
+    d_lat = p2 - p1
+    d_lng = math.radians(lng2 - lng1)
+    a = math.sin(d_lat / 2) ** 2 + math.cos(p1) * math.cos(p2) * math.sin(d_lng / 2) ** 2
+    return 2 * r * math.asin(math.sqrt(a))
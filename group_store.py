@@ -0,0 +1,136 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from shard import shard_local
+
+PROCESSED_GROUPS_DB = shard_local(os.getenv("PROCESSED_GROUPS_DB", "processed_groups.db"))
+PROCESSED_GROUPS_TTL = float(os.getenv("PROCESSED_GROUPS_TTL", str(7 * 24 * 3600)))
+PROCESSED_GROUPS_MAX = int(os.getenv("PROCESSED_GROUPS_MAX", "100000"))
+# A claim older than this is treated as abandoned and can be taken over.
+GROUP_CLAIM_TTL = float(os.getenv("GROUP_CLAIM_TTL", "300"))
+
+
+def group_key(group):
+    """
+    Dedupe key of a published group: groupId plus a hash of its sorted members.
+    The grouping job numbers groups from 1 on every run, so groupId alone would
+    make every later run look "already processed".
+    """
+    users = sorted(group.get('users') or [], key=str)
+    digest = hashlib.blake2b(json.dumps(users, default=str).encode("utf-8"), digest_size=8).hexdigest()
+    return f"{group.get('groupId')}:{digest}"
+
+
+class ProcessedGroupStore:
+    """
+    Bounded set of already published group IDs, persisted in a local sqlite file.
+
+    Membership is answered from an in-memory OrderedDict (O(1)); sqlite is only
+    written on mark_done/evict and read once at startup. Entries expire after `ttl`
+    seconds and the least recently seen ones are dropped above `max_entries`.
+    claim() / release() / mark_done() give one thread exclusive ownership of a key
+    (see group_key()).
+    """
+
+    def __init__(self, path=PROCESSED_GROUPS_DB, ttl=PROCESSED_GROUPS_TTL, max_entries=PROCESSED_GROUPS_MAX, claim_ttl=GROUP_CLAIM_TTL):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max(1, max_entries)
+        self.claim_ttl = claim_ttl
+
+        self._done = OrderedDict()
+        self._claims = {}
+        self._lock = threading.Lock()
+
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS processed_groups (group_id TEXT PRIMARY KEY, processed_at REAL NOT NULL)"
+        )
+        self._load()
+
+    @staticmethod
+    def _key(g_id):
+        return str(g_id)
+
+    def _load(self):
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            self._db.execute("DELETE FROM processed_groups WHERE processed_at < ?", (cutoff,))
+            rows = self._db.execute(
+                "SELECT group_id, processed_at FROM processed_groups ORDER BY processed_at"
+            ).fetchall()
+            for key, ts in rows:
+                self._done[key] = ts
+            self._evict_locked()
+        print(f" [STORE] Loaded {len(self._done)} processed group keys from {self.path}")
+
+    def _is_done_locked(self, key, now):
+        ts = self._done.get(key)
+        if ts is None:
+            return False
+        if now - ts > self.ttl:
+            del self._done[key]
+            self._db.execute("DELETE FROM processed_groups WHERE group_id = ?", (key,))
+            return False
+        self._done.move_to_end(key)
+        return True
+
+    def _evict_locked(self):
+        overflow = len(self._done) - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = [self._done.popitem(last=False)[0] for _ in range(overflow)]
+        self._db.executemany("DELETE FROM processed_groups WHERE group_id = ?", [(k,) for k in evicted])
+
+    def __contains__(self, g_id):
+        with self._lock:
+            return self._is_done_locked(self._key(g_id), time.time())
+
+    def __len__(self):
+        with self._lock:
+            return len(self._done)
+
+    def claim(self, g_id):
+        """Atomically take ownership of g_id. False if it is already processed or claimed."""
+        key = self._key(g_id)
+        now = time.time()
+        with self._lock:
+            if self._is_done_locked(key, now):
+                return False
+            claimed_at = self._claims.get(key)
+            if claimed_at is not None and now - claimed_at < self.claim_ttl:
+                return False
+            self._claims[key] = now
+            return True
+
+    def release(self, g_id):
+        """Give up a claim without marking the group as processed (it may be retried)."""
+        with self._lock:
+            self._claims.pop(self._key(g_id), None)
+
+    def mark_done(self, g_id):
+        key = self._key(g_id)
+        now = time.time()
+        with self._lock:
+            self._claims.pop(key, None)
+            self._done[key] = now
+            self._done.move_to_end(key)
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed_groups (group_id, processed_at) VALUES (?, ?)", (key, now)
+            )
+            self._evict_locked()
+
+    def stats(self):
+        with self._lock:
+            return {"processed": len(self._done), "claimed": len(self._claims)}
+
+    def close(self):
+        with self._lock:
+            self._db.close()
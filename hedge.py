@@ -0,0 +1,122 @@
+import asyncio
+import contextvars
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from metrics import metrics
+
+# Hedged requests: when a call has not answered after the stage's recent p95,
+# an identical backup call is sent and whichever answers first wins.
+HEDGE_ENABLED = os.getenv("GEOCODE_HEDGE", "0") == "1"
+HEDGE_QUANTILE = float(os.getenv("HEDGE_QUANTILE", "0.95"))
+HEDGE_MIN_DELAY = float(os.getenv("HEDGE_MIN_DELAY", "0.05"))
+# Hedges stay below this share of calls, so a slow upstream is not hit with 2x load.
+HEDGE_MAX_RATIO = float(os.getenv("HEDGE_MAX_RATIO", "0.1"))
+HEDGE_MIN_SAMPLES = int(os.getenv("HEDGE_MIN_SAMPLES", "50"))
+HEDGE_THREADS = int(os.getenv("HEDGE_THREADS", "16"))
+
+_executor = None
+_lock = threading.Lock()
+_calls = {}
+_hedges = {}
+_delays = {}  # stage -> (computed_at, delay); the percentile is recomputed at most once a second
+
+
+def _get_executor():
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=HEDGE_THREADS, thread_name_prefix="hedge")
+        return _executor
+
+
+def hedge_delay(stage):
+    """Seconds to wait before hedging a `stage` call, or None when hedging is off / not warmed up."""
+    if not HEDGE_ENABLED:
+        return None
+    now = time.monotonic()
+    cached = _delays.get(stage)
+    if cached and now - cached[0] < 1.0:
+        return cached[1]
+
+    delay = None
+    if metrics.sample_count("stage_seconds", stage=stage) >= HEDGE_MIN_SAMPLES:
+        p = metrics.percentile("stage_seconds", HEDGE_QUANTILE, stage=stage)
+        delay = max(HEDGE_MIN_DELAY, p) if p is not None else None
+    _delays[stage] = (now, delay)
+    return delay
+
+
+def _count_call(stage):
+    with _lock:
+        _calls[stage] = _calls.get(stage, 0) + 1
+
+
+def _allow_hedge(stage):
+    with _lock:
+        if _hedges.get(stage, 0) >= HEDGE_MAX_RATIO * _calls.get(stage, 0):
+            return False
+        _hedges[stage] = _hedges.get(stage, 0) + 1
+        return True
+
+
+def hedged(stage, fn, *args, **kwargs):
+    """fn(*args, **kwargs), plus one backup call if the first is slower than hedge_delay(stage)."""
+    delay = hedge_delay(stage)
+    if delay is None:
+        return fn(*args, **kwargs)
+
+    _count_call(stage)
+    executor = _get_executor()
+    # Each attempt gets its own copy of the caller's context (deadline, ...).
+    attempts = [executor.submit(contextvars.copy_context().run, fn, *args, **kwargs)]
+    done, _ = wait(attempts, timeout=delay)
+    if not done and _allow_hedge(stage):
+        metrics.inc("hedges_total", stage=stage, result="sent")
+        attempts.append(executor.submit(contextvars.copy_context().run, fn, *args, **kwargs))
+
+    pending = set(attempts)
+    error = None
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            if future.exception() is None:
+                if future is not attempts[0]:
+                    metrics.inc("hedges_total", stage=stage, result="won")
+                # The loser keeps running in the pool; its answer is simply dropped.
+                return future.result()
+            error = error or future.exception()
+    raise error
+
+
+async def async_hedged(stage, make_call):
+    """Await make_call(), plus one backup make_call() if the first is slower than hedge_delay(stage)."""
+    delay = hedge_delay(stage)
+    if delay is None:
+        return await make_call()
+
+    _count_call(stage)
+    attempts = [asyncio.ensure_future(make_call())]
+    try:
+        done, _ = await asyncio.wait(attempts, timeout=delay)
+        if not done and _allow_hedge(stage):
+            metrics.inc("hedges_total", stage=stage, result="sent")
+            attempts.append(asyncio.ensure_future(make_call()))
+
+        pending = set(attempts)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not attempts[0]:
+                        metrics.inc("hedges_total", stage=stage, result="won")
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in attempts:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,112 @@
+"""
+Import-time budget for the service entry points.
+
+Each module is imported in a fresh interpreter (best of --runs) with
+-X importtime; the check fails when an import is slower than its budget,
+raises, or leaves threads running behind (import must not start anything).
+
+  python import_budget.py
+  python import_budget.py --runs 5 --budget worker=0.3
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SUBPROJECT = os.path.join(ROOT, "user-description-bot-assistance")
+
+# module -> (working directory, budget in seconds)
+ENTRY_POINTS = {
+    "worker": (ROOT, 0.6),
+    "chat_bot_service.main": (SUBPROJECT, 1.5),
+    "knn_grouping.main": (SUBPROJECT, 0.6),
+}
+
+_MARKER = "-- import_budget probe --"
+
+_PROBE = (
+    "import sys, threading, time\n"
+    f"sys.stderr.write({_MARKER!r} + '\\n'); sys.stderr.flush()\n"
+    "t = time.perf_counter()\n"
+    "import {module}\n"
+    "print(time.perf_counter() - t, threading.active_count())\n"
+)
+
+
+def _slowest_imports(stderr, top):
+    rows = []
+    # Only what the probed import pulled in, not interpreter startup.
+    stderr = stderr.split(_MARKER, 1)[-1]
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        try:
+            rows.append((int(parts[0]), parts[2].strip()))
+        except ValueError:
+            continue  # header line
+    rows.sort(reverse=True)
+    return rows[:top]
+
+
+def measure(module, cwd, runs):
+    best = None
+    for _ in range(runs):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", _PROBE.format(module=module)],
+            cwd=cwd, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            error = proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else f"exit {proc.returncode}"
+            return {"error": error}
+        seconds, threads = proc.stdout.split()
+        result = {"seconds": float(seconds), "threads": int(threads), "stderr": proc.stderr}
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=8, help="slowest modules listed for entries over budget")
+    parser.add_argument("--budget", action="append", default=[], metavar="MODULE=SECONDS")
+    parser.add_argument("modules", nargs="*", help=f"default: {', '.join(ENTRY_POINTS)}")
+    args = parser.parse_args()
+
+    budgets = {module: budget for module, (_, budget) in ENTRY_POINTS.items()}
+    for item in args.budget:
+        module, _, seconds = item.partition("=")
+        budgets[module] = float(seconds)
+
+    failed = False
+    for module in args.modules or list(ENTRY_POINTS):
+        cwd = ENTRY_POINTS.get(module, (ROOT, None))[0]
+        budget = budgets.get(module, 1.0)
+        result = measure(module, cwd, max(1, args.runs))
+
+        if "error" in result:
+            print(f" [BUDGET] {module:<24} FAIL  import error: {result['error']}")
+            failed = True
+            continue
+
+        problems = []
+        if result["seconds"] > budget:
+            problems.append(f"over budget {budget:.2f}s")
+        if result["threads"] > 1:
+            problems.append(f"{result['threads'] - 1} thread(s) started at import")
+        status = "FAIL" if problems else "ok"
+        print(f" [BUDGET] {module:<24} {status:<5} {result['seconds'] * 1000:7.1f} ms  " + "; ".join(problems))
+
+        if result["seconds"] > budget:
+            for self_us, name in _slowest_imports(result["stderr"], args.top):
+                print(f"            {self_us / 1000:7.1f} ms  {name}")
+        failed = failed or bool(problems)
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
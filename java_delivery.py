@@ -0,0 +1,280 @@
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import metrics
+from shard import shard_local
+
+JAVA_API_URL = os.getenv("JAVA_API_URL")
+# Optional endpoint accepting a JSON array of events; without it events are POSTed one by one.
+JAVA_BULK_API_URL = os.getenv("JAVA_BULK_API_URL")
+
+JAVA_BATCH_SIZE = int(os.getenv("JAVA_BATCH_SIZE", "20"))
+JAVA_BATCH_WINDOW = float(os.getenv("JAVA_BATCH_WINDOW", "0.5"))
+JAVA_MAX_RETRIES = int(os.getenv("JAVA_MAX_RETRIES", "5"))
+JAVA_RETRY_BASE_DELAY = float(os.getenv("JAVA_RETRY_BASE_DELAY", "0.5"))
+JAVA_RETRY_MAX_DELAY = float(os.getenv("JAVA_RETRY_MAX_DELAY", "30"))
+JAVA_DELIVERY_THREADS = int(os.getenv("WORKER_JAVA_CONCURRENCY", "4"))
+JAVA_SPOOL_PATH = shard_local(os.getenv("JAVA_SPOOL_PATH", "java_spool.jsonl"))
+
+RETRYABLE_STATUSES = {408, 425, 429, 500, 502, 503, 504}
+
+
+class DeliveryFailed(Exception):
+    def __init__(self, message, retryable=True, retry_after=None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.retry_after = retry_after
+
+
+class JavaDelivery:
+    """
+    Outbound stage for events going to the Java API.
+
+    - one keep-alive requests.Session shared by a few sender threads,
+    - micro-batches of up to `batch_size` events / `batch_window` seconds
+      when a bulk endpoint is configured,
+    - exponential backoff with jitter (honours Retry-After),
+    - events that still fail are appended to an on-disk spool
+      and re-queued on the next start(). The replayed file is kept until
+      each of its events is delivered, rejected or spooled again, so a
+      crash during replay loses nothing (delivery is at-least-once).
+    """
+
+    def __init__(
+        self,
+        url=JAVA_API_URL,
+        bulk_url=JAVA_BULK_API_URL,
+        batch_size=JAVA_BATCH_SIZE,
+        batch_window=JAVA_BATCH_WINDOW,
+        max_retries=JAVA_MAX_RETRIES,
+        threads=JAVA_DELIVERY_THREADS,
+        spool_path=JAVA_SPOOL_PATH,
+        queue_size=1000,
+    ):
+        self.url = url
+        self.bulk_url = bulk_url
+        self.batch_size = max(1, batch_size) if bulk_url else 1
+        self.batch_window = batch_window
+        self.max_retries = max_retries
+        self.threads = max(1, threads)
+        self.spool_path = spool_path
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.threads)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._spool_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._senders = []
+        self._running = False
+        self._stop_event = threading.Event()
+        # id() of replayed payloads not yet settled; the .replay file goes once this is empty.
+        self._replay_pending = set()
+        self._replay_path = spool_path + ".replay"
+        self._stats = {"sent": 0, "batches": 0, "retries": 0, "spooled": 0, "dropped": 0, "replayed": 0}
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._stop_event.clear()
+        metrics.gauge("java_queue_depth", self._queue.qsize)
+        self._replay_spool()
+        for i in range(self.threads):
+            t = threading.Thread(target=self._sender_loop, name=f"java-delivery-{i}", daemon=True)
+            t.start()
+            self._senders.append(t)
+
+    def send(self, payload):
+        """Queue one event. Blocks while the outbound queue is full."""
+        self._queue.put(payload)
+
+    def stop(self, timeout=10):
+        """Stop the senders; whatever is still queued goes to the spool."""
+        if not self._running:
+            return
+        self._running = False
+        # Wakes senders sleeping in a retry backoff; their batch goes to the spool.
+        self._stop_event.set()
+        for t in self._senders:
+            t.join(timeout=timeout)
+        self._senders = []
+
+        leftover = []
+        while True:
+            try:
+                leftover.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if leftover:
+            self._spool(leftover)
+        self.session.close()
+
+    def stats(self):
+        with self._stats_lock:
+            return dict(self._stats, queued=self._queue.qsize())
+
+    def _count(self, key, n=1):
+        with self._stats_lock:
+            self._stats[key] += n
+        metrics.inc(f"java_{key}_total", n)
+
+    def _next_batch(self):
+        try:
+            first = self._queue.get(timeout=0.5)
+        except queue.Empty:
+            return []
+
+        batch = [first]
+        deadline = time.monotonic() + self.batch_window
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _sender_loop(self):
+        while self._running:
+            batch = self._next_batch()
+            if batch:
+                self._deliver(batch)
+
+    def _deliver(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._post(batch)
+                self._count("sent", len(batch))
+                self._count("batches")
+                print(f" [HTTP] Delivered {len(batch)} event(s) to Java.")
+                self._settle(batch)
+                return
+            except DeliveryFailed as e:
+                if not e.retryable:
+                    print(f" [HTTP] Java rejected events {[p.get('eventId') for p in batch]}: {e}")
+                    self._count("dropped", len(batch))
+                    self._settle(batch)
+                    return
+                if attempt == self.max_retries:
+                    print(f" [HTTP] Giving up after {attempt + 1} attempts: {e}")
+                    break
+
+                delay = min(JAVA_RETRY_MAX_DELAY, JAVA_RETRY_BASE_DELAY * (2 ** attempt))
+                delay = delay * random.uniform(0.5, 1.0)
+                if e.retry_after is not None:
+                    delay = max(delay, e.retry_after)
+                print(f" [HTTP] {e} - retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                self._count("retries")
+                if self._stop_event.wait(delay):
+                    break
+
+        self._spool(batch)
+
+    def _post(self, batch):
+        if len(batch) > 1:
+            url, body = self.bulk_url, batch
+        else:
+            url, body = self.url, batch[0]
+
+        print(f" [HTTP] Sending {len(batch)} event(s) to Java (first: {batch[0].get('eventId')})...")
+        try:
+            with metrics.timer("stage_seconds", stage="java_post"):
+                res = self.session.post(url, json=body, timeout=5)
+        except requests.RequestException as e:
+            raise DeliveryFailed(f"Connection failed: {e}")
+
+        if res.status_code in [200, 201, 202, 204]:
+            return
+
+        retry_after = res.headers.get("Retry-After")
+        try:
+            retry_after = float(retry_after) if retry_after is not None else None
+        except ValueError:
+            retry_after = None
+
+        raise DeliveryFailed(
+            f"Java Error: {res.status_code} - {res.text[:200]}",
+            retryable=res.status_code in RETRYABLE_STATUSES,
+            retry_after=retry_after,
+        )
+
+    def _spool(self, batch):
+        with self._spool_lock:
+            with open(self.spool_path, "a", encoding="utf-8") as f:
+                for payload in batch:
+                    f.write(json.dumps(payload, ensure_ascii=False) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+        self._count("spooled", len(batch))
+        print(f" [SPOOL] Saved {len(batch)} event(s) to {self.spool_path} for replay.")
+        self._settle(batch)
+
+    def _settle(self, batch):
+        """Replayed events in `batch` are delivered, rejected or durably re-spooled."""
+        with self._spool_lock:
+            if not self._replay_pending:
+                return
+            for payload in batch:
+                self._replay_pending.discard(id(payload))
+            if not self._replay_pending and os.path.exists(self._replay_path):
+                os.remove(self._replay_path)
+
+    def _replay_spool(self):
+        replay_path = self._replay_path
+        with self._spool_lock:
+            if os.path.exists(self.spool_path):
+                if os.path.exists(replay_path):
+                    # A .replay left by a crash still holds undelivered events: merge, don't overwrite.
+                    with open(self.spool_path, "r", encoding="utf-8") as src, open(replay_path, "a", encoding="utf-8") as dst:
+                        for line in src:
+                            dst.write(line if line.endswith("\n") else line + "\n")
+                        dst.flush()
+                        os.fsync(dst.fileno())
+                    os.remove(self.spool_path)
+                else:
+                    os.replace(self.spool_path, replay_path)
+            if not os.path.exists(replay_path):
+                return
+
+        payloads = []
+        with open(replay_path, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    payloads.append(json.loads(line))
+                except ValueError:
+                    print(f" [SPOOL] Skipping corrupt line: {line[:80]}")
+
+        if not payloads:
+            os.remove(replay_path)
+            return
+
+        with self._spool_lock:
+            self._replay_pending = {id(p) for p in payloads}
+
+        # Re-spool anything that does not fit in the queue instead of blocking startup.
+        overflow = []
+        for payload in payloads:
+            try:
+                self._queue.put_nowait(payload)
+            except queue.Full:
+                overflow.append(payload)
+        if overflow:
+            self._spool(overflow)
+
+        self._count("replayed", len(payloads) - len(overflow))
+        print(f" [SPOOL] Replaying {len(payloads) - len(overflow)} event(s) from {replay_path}.")
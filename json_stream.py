@@ -0,0 +1,105 @@
+import codecs
+import json
+
+# Bytes decoded per step by iter_json_array; bounds the text held in memory at once.
+JSON_STREAM_CHUNK = 64 * 1024
+
+_WHITESPACE = " \t\n\r"
+
+
+class JsonArrayStream:
+    """
+    Incremental decoder for a top-level JSON array, yielding the elements one by
+    one as soon as each is complete. A top-level object is yielded as a single
+    element, so publishers sending one group instead of a list keep working.
+
+    feed() takes str or bytes (split anywhere, also inside UTF-8 sequences)
+    and returns the elements completed so far; close() checks that the
+    document ended properly. Elements must be separated by ',' as in any
+    JSON array; anything else between them raises ValueError.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._buf = ""
+        self._pos = 0
+        self._offset = 0  # characters dropped from the front of _buf, for error messages
+        # start -> first -> (sep -> value)* -> done, or start -> single -> done
+        self._state = "start"
+
+    def feed(self, chunk):
+        if not isinstance(chunk, str):
+            chunk = self._utf8.decode(chunk)
+        self._offset += self._pos
+        self._buf = self._buf[self._pos:] + chunk
+        self._pos = 0
+        return list(self._drain(final=False))
+
+    def close(self):
+        items = list(self._drain(final=True))
+        if self._state != "done" and (self._state != "start" or self._buf.strip(_WHITESPACE)):
+            raise ValueError("JSON document ended before the closing ']'")
+        return items
+
+    def _skip(self, chars):
+        buf, pos = self._buf, self._pos
+        while pos < len(buf) and buf[pos] in chars:
+            pos += 1
+        self._pos = pos
+
+    def _decode_next(self, final):
+        try:
+            value, end = self._decoder.raw_decode(self._buf, self._pos)
+        except json.JSONDecodeError:
+            if final:
+                raise
+            return None, None
+        # A bare number at the end of the buffer may continue in the next chunk.
+        if end == len(self._buf) and not final and not isinstance(value, (dict, list, str)):
+            return None, None
+        return value, end
+
+    def _drain(self, final):
+        while self._state != "done":
+            self._skip(_WHITESPACE)
+            if self._pos >= len(self._buf):
+                return
+
+            if self._state == "start":
+                if self._buf[self._pos] == "[":
+                    self._state = "first"
+                    self._pos += 1
+                else:
+                    self._state = "single"
+                continue
+
+            char = self._buf[self._pos]
+            if self._state == "sep":
+                if char not in ",]":
+                    raise ValueError(f"Expected ',' or ']' between array elements at offset {self._offset + self._pos}, got {char!r}")
+                self._pos += 1
+                self._state = "value" if char == "," else "done"
+                continue
+            if char == "]":
+                if self._state != "first":
+                    raise ValueError(f"Trailing ',' before ']' at offset {self._offset + self._pos}")
+                self._pos += 1
+                self._state = "done"
+                return
+
+            value, end = self._decode_next(final)
+            if end is None:
+                return
+            self._pos = end
+            self._state = "done" if self._state == "single" else "sep"
+            yield value
+
+
+def iter_json_array(data, chunk_size=JSON_STREAM_CHUNK):
+    """Yield the elements of a JSON array held in `data` (bytes/str) without building the whole list."""
+    stream = JsonArrayStream()
+    view = memoryview(data) if not isinstance(data, str) else data
+    for start in range(0, len(view), chunk_size):
+        yield from stream.feed(view[start:start + chunk_size])
+    yield from stream.close()
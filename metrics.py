@@ -0,0 +1,209 @@
+import bisect
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from shard import shard_port
+
+# With several shards, shard i serves on METRICS_PORT + i.
+METRICS_PORT = shard_port(int(os.getenv("METRICS_PORT", "9108")))
+METRICS_LOG_INTERVAL = float(os.getenv("METRICS_LOG_INTERVAL", "60"))
+
+# Seconds; covers cache hits (sub-ms) up to slow LLM calls.
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Recent observations kept per histogram for p50/p95/p99.
+_WINDOW = 2048
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _render_labels(key, extra=()):
+    pairs = list(key) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in pairs) + "}"
+
+
+class Histogram:
+    """Cumulative Prometheus-style buckets plus a sliding window for percentiles."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.recent = deque(maxlen=_WINDOW)
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.recent.append(value)
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        values = sorted(self.recent)
+        return values[min(len(values) - 1, int(q * len(values)))]
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "p50": self.percentile(0.50),
+            "p95": self.percentile(0.95),
+            "p99": self.percentile(0.99),
+        }
+
+
+class Metrics:
+    """Process-wide counters, histograms and callback gauges, rendered as Prometheus text."""
+
+    def __init__(self, prefix="radar"):
+        self.prefix = prefix
+        self._counters = {}
+        self._histograms = {}
+        self._gauges = {}
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value, **labels):
+        key = (name, _label_key(labels))
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def gauge(self, name, fn, **labels):
+        """Register fn() -> number, evaluated on every scrape."""
+        with self._lock:
+            self._gauges[(name, _label_key(labels))] = fn
+
+    def sample_count(self, name, **labels):
+        """Observations currently in the percentile window of a histogram."""
+        with self._lock:
+            hist = self._histograms.get((name, _label_key(labels)))
+            return len(hist.recent) if hist else 0
+
+    def percentile(self, name, q, **labels):
+        with self._lock:
+            hist = self._histograms.get((name, _label_key(labels)))
+            return hist.percentile(q) if hist else None
+
+    def render_prometheus(self):
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            histograms = sorted(self._histograms.items(), key=lambda kv: kv[0])
+            gauges = sorted(self._gauges.items(), key=lambda kv: kv[0])
+
+            typed = set()
+            for (name, key), value in counters:
+                full = f"{self.prefix}_{name}"
+                if full not in typed:
+                    lines.append(f"# TYPE {full} counter")
+                    typed.add(full)
+                lines.append(f"{full}{_render_labels(key)} {value}")
+
+            for (name, key), hist in histograms:
+                full = f"{self.prefix}_{name}"
+                if full not in typed:
+                    lines.append(f"# TYPE {full} histogram")
+                    typed.add(full)
+                cumulative = 0
+                bounds = [str(b) for b in hist.buckets] + ["+Inf"]
+                for bound, count in zip(bounds, hist.counts):
+                    cumulative += count
+                    lines.append(f"{full}_bucket{_render_labels(key, [('le', bound)])} {cumulative}")
+                lines.append(f"{full}_sum{_render_labels(key)} {hist.sum}")
+                lines.append(f"{full}_count{_render_labels(key)} {hist.count}")
+
+        for (name, key), fn in gauges:
+            full = f"{self.prefix}_{name}"
+            try:
+                value = fn()
+            except Exception:
+                continue
+            if full not in typed:
+                lines.append(f"# TYPE {full} gauge")
+                typed.add(full)
+            lines.append(f"{full}{_render_labels(key)} {value}")
+
+        return "\n".join(lines) + "\n"
+
+    def summary(self):
+        with self._lock:
+            out = {"counters": {}, "latency": {}}
+            for (name, key), value in self._counters.items():
+                out["counters"][name + _render_labels(key)] = value
+            for (name, key), hist in self._histograms.items():
+                out["latency"][name + _render_labels(key)] = hist.summary()
+            return out
+
+
+metrics = Metrics()
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = metrics.render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT, host="127.0.0.1"):
+    """Serve /metrics on a daemon thread. Returns the server, or None when port is 0 or taken."""
+    if not port:
+        return None
+    try:
+        server = ThreadingHTTPServer((host, port), _Handler)
+    except OSError as e:
+        # Metrics are optional; a busy port must not take the worker down.
+        print(f" [METRICS] Cannot serve metrics on {host}:{port}: {e}")
+        return None
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    print(f" [METRICS] Serving Prometheus metrics on http://{host}:{port}/metrics")
+    return server
+
+
+def start_summary_logger(interval=METRICS_LOG_INTERVAL):
+    """Print a one-line JSON summary (counters + p50/p95/p99) every `interval` seconds."""
+    if not interval:
+        return None
+
+    def _loop():
+        while True:
+            time.sleep(interval)
+            print(json.dumps({"event": "metrics", "ts": round(time.time(), 3), **metrics.summary()}, ensure_ascii=False))
+
+    t = threading.Thread(target=_loop, name="metrics-log", daemon=True)
+    t.start()
+    return t
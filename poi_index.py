@@ -0,0 +1,205 @@
+import csv
+import json
+import math
+import os
+import re
+import unicodedata
+
+import geohash
+
+POI_DATASET = os.getenv("POI_DATASET")
+POI_MAX_DISTANCE_M = float(os.getenv("POI_MAX_DISTANCE_M", "3000"))
+
+# Grid cell size in degrees (~1.1 km of latitude); queries grow ring by ring from the centre cell.
+_CELL_DEG = 0.01
+
+# OSM tag keys whose values describe what a place is.
+_TAG_KEYS = ("amenity", "leisure", "sport", "shop", "tourism", "cuisine", "club", "craft")
+
+# Group traits are Polish free text, OSM tags are English; the most common traits mapped to tag values.
+TRAIT_TAGS = {
+    "kawa": ["cafe"],
+    "kawiarnia": ["cafe"],
+    "planszówki": ["board", "games", "cafe"],
+    "gry": ["games", "amusement"],
+    "pływanie": ["swimming", "pool", "water"],
+    "jachty": ["marina", "sailing"],
+    "żeglarstwo": ["marina", "sailing"],
+    "bieganie": ["running", "park", "track"],
+    "rower": ["cycling", "bicycle"],
+    "siłownia": ["fitness", "centre"],
+    "wspinaczka": ["climbing"],
+    "taniec": ["dance", "nightclub"],
+    "muzyka": ["music", "bar", "pub"],
+    "gotowanie": ["restaurant", "cooking"],
+    "jedzenie": ["restaurant", "fast", "food"],
+    "piwo": ["pub", "bar", "biergarten"],
+    "książki": ["library", "books"],
+    "kino": ["cinema"],
+    "teatr": ["theatre"],
+    "sztuka": ["arts", "gallery", "museum"],
+    "piłka": ["soccer", "pitch"],
+    "koszykówka": ["basketball"],
+    "tenis": ["tennis"],
+    "spacery": ["park", "garden"],
+    "programowanie": ["coworking", "hackerspace", "cafe"],
+}
+
+
+def _tokens(text):
+    text = unicodedata.normalize("NFKC", str(text or "")).lower()
+    return {t for t in re.split(r"[^0-9a-ząćęłńóśźż]+", text) if len(t) > 1}
+
+
+class PoiIndex:
+    """
+    In-memory POI index: a uniform lat/lng grid for spatial queries plus an
+    inverted index token -> POI ids built from the name, OSM tags and categories.
+
+    Load with PoiIndex.from_file() from a CSV (name, lat, lon/lng, tags/category
+    columns) or a GeoJSON FeatureCollection of points (e.g. an OSM amenity extract).
+    """
+
+    def __init__(self, pois=()):
+        self.pois = []
+        self._grid = {}
+        self._by_token = {}
+        self._category_ids = {}
+        for poi in pois:
+            self.add(poi)
+
+    def add(self, poi):
+        poi_id = len(self.pois)
+        self.pois.append(poi)
+        self._grid.setdefault(self._cell(poi["lat"], poi["lng"]), []).append(poi_id)
+        for token in poi["tokens"]:
+            self._by_token.setdefault(token, set()).add(poi_id)
+        self._category_ids.clear()
+
+    def __len__(self):
+        return len(self.pois)
+
+    @staticmethod
+    def _cell(lat, lng):
+        return int(math.floor(lat / _CELL_DEG)), int(math.floor(lng / _CELL_DEG))
+
+    @staticmethod
+    def make_poi(name, lat, lng, tags=None, address=None):
+        tags = {k: v for k, v in (tags or {}).items() if v}
+        tokens = _tokens(name)
+        for key, value in tags.items():
+            if key in _TAG_KEYS or key == "category":
+                tokens |= _tokens(value.replace(";", " ").replace("_", " "))
+        return {
+            "name": name,
+            "lat": float(lat),
+            "lng": float(lng),
+            "address": address,
+            "tags": tags,
+            "tokens": tokens,
+        }
+
+    @classmethod
+    def from_file(cls, path):
+        if path.lower().endswith((".geojson", ".json")):
+            pois = cls._read_geojson(path)
+        else:
+            pois = cls._read_csv(path)
+        index = cls(pois)
+        print(f" [POI] Loaded {len(index)} POIs from {path} ({len(index._by_token)} tokens)")
+        return index
+
+    @classmethod
+    def _read_geojson(cls, path):
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        for feature in data.get("features", []):
+            geometry = feature.get("geometry") or {}
+            props = feature.get("properties") or {}
+            name = props.get("name")
+            if geometry.get("type") != "Point" or not name:
+                continue
+            lng, lat = geometry["coordinates"][:2]
+            address = props.get("addr:full") or " ".join(
+                p for p in (props.get("addr:street"), props.get("addr:housenumber"), props.get("addr:city")) if p
+            )
+            yield cls.make_poi(name, lat, lng, tags=props, address=address or None)
+
+    @classmethod
+    def _read_csv(cls, path):
+        with open(path, "r", encoding="utf-8", newline="") as f:
+            for row in csv.DictReader(f):
+                name = row.get("name")
+                lat = row.get("lat") or row.get("latitude")
+                lng = row.get("lng") or row.get("lon") or row.get("longitude")
+                if not name or not lat or not lng:
+                    continue
+                tags = dict(row)
+                if row.get("tags"):
+                    tags.update(t.split("=", 1) for t in row["tags"].split(";") if "=" in t)
+                yield cls.make_poi(name, lat, lng, tags=tags, address=row.get("address") or None)
+
+    def candidates(self, category):
+        """POI ids matching any token of the category string ('jachty, pływanie' -> both)."""
+        ids = self._category_ids.get(category)
+        if ids is not None:
+            return ids
+
+        tokens = set()
+        for token in _tokens(category.replace(",", " ")):
+            tokens.add(token)
+            tokens.update(TRAIT_TAGS.get(token, ()))
+
+        ids = set()
+        for token in tokens:
+            ids |= self._by_token.get(token, set())
+            # cheap stemming for Polish inflected forms: "kawiarnie" ~ "kawiarnia"
+            if len(token) > 5:
+                stem = token[:-2]
+                for other, other_ids in self._by_token.items():
+                    if other.startswith(stem):
+                        ids |= other_ids
+
+        self._category_ids[category] = ids
+        return ids
+
+    def nearest(self, lat, lng, category=None, max_distance_m=POI_MAX_DISTANCE_M):
+        """Closest POI matching `category` (or any POI when None) within max_distance_m, else None."""
+        allowed = self.candidates(category) if category else None
+        if allowed is not None and not allowed:
+            return None
+
+        c_lat, c_lng = self._cell(lat, lng)
+        cell_m = _CELL_DEG * 111_320 * max(0.1, math.cos(math.radians(lat)))
+        max_ring = int(math.ceil(max_distance_m / cell_m)) + 1
+
+        best, best_dist = None, max_distance_m
+        for ring in range(max_ring + 1):
+            # Anything in ring r is at least (r - 1) cells away, so stop once that beats the best hit.
+            if best is not None and (ring - 1) * cell_m > best_dist:
+                break
+            for d_lat in range(-ring, ring + 1):
+                for d_lng in range(-ring, ring + 1):
+                    if max(abs(d_lat), abs(d_lng)) != ring:
+                        continue
+                    for poi_id in self._grid.get((c_lat + d_lat, c_lng + d_lng), ()):
+                        if allowed is not None and poi_id not in allowed:
+                            continue
+                        poi = self.pois[poi_id]
+                        dist = geohash.distance_m(lat, lng, poi["lat"], poi["lng"])
+                        if dist <= best_dist:
+                            best, best_dist = poi, dist
+
+        return best
+
+
+_index = None
+
+
+def get_poi_index():
+    """The POI index for POI_DATASET, loaded on first use (None when not configured)."""
+    global _index
+    if _index is None and POI_DATASET:
+        _index = PoiIndex.from_file(POI_DATASET)
+    return _index
@@ -0,0 +1,413 @@
+"""
+Record / replay benchmark for the radar worker.
+
+  python radar_bench.py record frames.jsonl            # save live /topic/groups frames
+  python radar_bench.py replay frames.jsonl --rate 5   # replay them against local stubs
+  python radar_bench.py replay --groups user-description-bot-assistance/users_knn_groups.json
+
+Replay runs RadarWorker in-process against a local websocket STOMP broker
+(so connect, subscribe, reconnects and socket reads are part of the run),
+a stub LLM and stub Photon geocoder with configurable latency, and a local HTTP
+stand-in for the Java endpoint. It reports throughput, end-to-end p50/p99
+latency (frame sent by the broker -> event received by "Java"), peak thread
+count and peak RSS.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import re
+import resource
+import sys
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+from stomp_codec import StompDecoder
+
+
+def _percentile(values, q):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+# ================== RECORD ==================
+
+def record(path, uri, duration):
+    import websocket
+
+    from worker import stomp_frame
+
+    out = open(path, "a", encoding="utf-8")
+    started = time.monotonic()
+    count = [0]
+
+    def on_open(ws):
+        ws.send(stomp_frame("CONNECT", headers={"accept-version": "1.1,1.2", "host": "localhost"}))
+        time.sleep(0.5)
+        ws.send(stomp_frame("SUBSCRIBE", headers={"id": "bench-0", "destination": "/topic/groups"}))
+        print(f" [BENCH] Recording /topic/groups from {uri} into {path}")
+
+    def on_message(ws, message):
+        if "\n\n" not in message:
+            return
+        out.write(json.dumps({"t": round(time.monotonic() - started, 4), "frame": message}, ensure_ascii=False) + "\n")
+        out.flush()
+        count[0] += 1
+        print(f" [BENCH] Frame {count[0]} ({len(message)} bytes)")
+
+    ws = websocket.WebSocketApp(uri, on_open=on_open, on_message=on_message)
+    if duration:
+        threading.Timer(duration, ws.close).start()
+    try:
+        ws.run_forever()
+    finally:
+        out.close()
+    print(f" [BENCH] Recorded {count[0]} frames.")
+
+
+# ================== STUBS ==================
+
+class StubLLM:
+    """Stands in for OpenAI(): chat.completions.create() sleeps `latency` s and returns a JSON venue."""
+
+    PLACES = ["Rynek", "Kawiarnia Pod Aniołami", "Park Miejski", "Klub Sportowy", "Bulwary", "Hala Targowa"]
+
+    def __init__(self, latency, jitter):
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def create(self, messages, **kwargs):
+        with self._lock:
+            self.calls += 1
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+        prompt = messages[-1]["content"]
+
+        if '"venues"' in prompt:
+            ids = re.findall(r"\[id=(\d+)\]", prompt)
+            content = {"venues": [{"id": int(i), "place_name": f"{random.choice(self.PLACES)}, Warszawa", "description": "Stub."} for i in ids]}
+        elif '"candidates"' in prompt:
+            content = {"candidates": [{"place_name": f"{p}, Warszawa", "description": "Stub."} for p in random.sample(self.PLACES, 3)]}
+        elif '"place_name"' in prompt:
+            content = {"place_name": f"{random.choice(self.PLACES)}, Warszawa", "description": "Stub."}
+        else:
+            content = {"description": "Stub."}
+        message = SimpleNamespace(content=json.dumps(content, ensure_ascii=False))
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+
+class StubGeocoder:
+    """Stands in for geopy's Photon: reverse() / geocode() sleep and return a fixed-shape location."""
+
+    def __init__(self, latency, jitter, miss_rate):
+        self.latency = latency
+        self.jitter = jitter
+        self.miss_rate = miss_rate
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def _sleep(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(max(0.0, random.gauss(self.latency, self.jitter)))
+
+    def reverse(self, query, **kwargs):
+        self._sleep()
+        lat, lng = (float(x) for x in query.split(","))
+        return SimpleNamespace(address=f"ul. Testowa, {lat:.3f} {lng:.3f}", latitude=lat, longitude=lng)
+
+    def geocode(self, query, **kwargs):
+        self._sleep()
+        if random.random() < self.miss_rate:
+            return None
+        return SimpleNamespace(address=f"{query} (stub)", latitude=52.23 + random.random() / 100, longitude=21.01 + random.random() / 100)
+
+
+class StubJava:
+    """Local HTTP server standing in for JAVA_API_URL; records when each eventId arrives."""
+
+    def __init__(self, latency):
+        self.received = {}
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"null")
+                if latency:
+                    time.sleep(latency)
+                now = time.monotonic()
+                with stub.lock:
+                    for event in body if isinstance(body, list) else [body]:
+                        stub.received.setdefault(event.get("eventId"), now)
+                self.send_response(200)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}/api/events"
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    def count(self):
+        with self.lock:
+            return len(self.received)
+
+
+class StompBroker:
+    """
+    Local websocket server speaking just enough STOMP for the worker: answers
+    CONNECT, and once /topic/groups is subscribed sends the frames at `rate`
+    frames/s (0 = recorded timing). With `drop_every` it closes the connection
+    after that many frames, so the worker's reconnect path is exercised too;
+    the next subscription continues with the following frame.
+    """
+
+    def __init__(self, frames, rate, drop_every=0):
+        self.frames = frames
+        self.rate = rate
+        self.drop_every = drop_every
+        self.dispatched = {}
+        self.connections = 0
+        self.done = threading.Event()
+        self.uri = None
+
+        self.sent = 0
+        self._started = None
+        self._loop = asyncio.new_event_loop()
+        self._ready = threading.Event()
+        threading.Thread(target=self._serve, name="bench-broker", daemon=True).start()
+        self._ready.wait()
+
+    def _serve(self):
+        import websockets
+
+        asyncio.set_event_loop(self._loop)
+        server = self._loop.run_until_complete(websockets.serve(self._handle, "127.0.0.1", 0))
+        port = next(iter(server.sockets)).getsockname()[1]
+        self.uri = f"ws://127.0.0.1:{port}/ws"
+        self._ready.set()
+        self._loop.run_forever()
+
+    def close(self):
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _handle(self, ws, path=None):
+        self.connections += 1
+        decoder = StompDecoder()
+        async for message in ws:
+            for frame in decoder.feed(message):
+                if frame.command in ("CONNECT", "STOMP"):
+                    await ws.send("CONNECTED\nversion:1.2\nheart-beat:0,0\n\n\x00")
+                elif frame.command == "SUBSCRIBE" and frame.headers.get("destination") == "/topic/groups":
+                    await self._stream(ws)
+                    return
+
+    async def _stream(self, ws):
+        if self._started is None:
+            self._started = time.monotonic()
+        this_connection = 0
+        while self.sent < len(self.frames):
+            t, frame = self.frames[self.sent]
+            due = self._started + (self.sent / self.rate if self.rate else t)
+            delay = due - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            now = time.monotonic()
+            for g_id in _group_ids(frame):
+                self.dispatched.setdefault(g_id, now)
+            await ws.send(frame)
+            self.sent += 1
+            this_connection += 1
+            if self.drop_every and this_connection >= self.drop_every and self.sent < len(self.frames):
+                print(f" [BENCH] Dropping the connection after frame {self.sent}")
+                await ws.close()
+                return
+
+        self.done.set()
+        await ws.wait_closed()
+
+
+# ================== REPLAY ==================
+
+def _frame_body(frame):
+    return frame.split("\n\n", 1)[1].replace("\x00", "").strip() if "\n\n" in frame else ""
+
+
+def _group_ids(frame):
+    try:
+        data = json.loads(_frame_body(frame))
+    except ValueError:
+        return []
+    groups = data if isinstance(data, list) else [data]
+    return [g.get("groupId") for g in groups if g.get("latitude") is not None and g.get("longitude") is not None]
+
+
+def _message_frame(groups):
+    body = json.dumps(groups, ensure_ascii=False)
+    return f"MESSAGE\ndestination:/topic/groups\ncontent-type:application/json\n\n{body}\x00"
+
+
+def load_frames(path=None, groups_path=None, batch=0, loops=1):
+    frames = []
+    if path:
+        with open(path, "r", encoding="utf-8") as f:
+            frames = [(rec["t"], rec["frame"]) for rec in map(json.loads, filter(str.strip, f))]
+    elif groups_path:
+        with open(groups_path, "r", encoding="utf-8") as f:
+            groups = json.load(f)
+        size = batch or len(groups)
+        frames = [(0.0, _message_frame(groups[i:i + size])) for i in range(0, len(groups), size)]
+
+    # Repeat with shifted groupIds so dedupe does not swallow later loops.
+    result = []
+    for loop in range(loops):
+        offset = loop * 1_000_000
+        span = frames[-1][0] + 1 if frames else 0
+        for t, frame in frames:
+            if loop:
+                data = json.loads(_frame_body(frame))
+                for g in data if isinstance(data, list) else [data]:
+                    if isinstance(g.get("groupId"), int):
+                        g["groupId"] += offset
+                frame = _message_frame(data)
+            result.append((t + loop * span, frame))
+    return result
+
+
+def replay(args):
+    workdir = tempfile.mkdtemp(prefix="radar_bench_")
+    stub_java = StubJava(args.java_latency)
+
+    frames = load_frames(args.frames, args.groups, args.batch, args.loops)
+    expected = {g for _, frame in frames for g in _group_ids(frame)}
+    if not expected:
+        print(" [BENCH] Nothing to replay.")
+        return
+    broker = StompBroker(frames, args.rate, args.drop_every)
+
+    # The worker reads its config from the environment at import time.
+    os.environ.update({
+        "WS_URI": broker.uri,
+        "JAVA_API_URL": stub_java.url,
+        "OPENAI_API_KEY": os.getenv("OPENAI_API_KEY") or "bench",
+        "PROCESSED_GROUPS_DB": os.path.join(workdir, "processed.db"),
+        "JAVA_SPOOL_PATH": os.path.join(workdir, "spool.jsonl"),
+        "REVERSE_CACHE_PATH": "",
+        "FORWARD_CACHE_PATH": "",
+        "METRICS_PORT": os.getenv("METRICS_PORT", "0"),
+        "METRICS_LOG_INTERVAL": "0",
+    })
+    import venue_manager as vm_module
+    from worker import RadarWorker
+
+    llm = StubLLM(args.llm_latency, args.llm_latency / 4)
+    geocoder = StubGeocoder(args.geo_latency, args.geo_latency / 4, args.geo_miss_rate)
+    vm = vm_module.get_venue_manager()
+    vm.client = llm
+    vm.geolocator = geocoder
+
+    worker = RadarWorker()
+
+    peak_threads = [threading.active_count()]
+    sampling = [True]
+
+    def sample_threads():
+        while sampling[0]:
+            peak_threads[0] = max(peak_threads[0], threading.active_count())
+            time.sleep(0.02)
+
+    threading.Thread(target=sample_threads, daemon=True).start()
+
+    print(f" [BENCH] Replaying {len(frames)} frames / {len(expected)} groups via {broker.uri}...")
+    started = time.monotonic()
+    worker.start()
+
+    deadline = started + args.timeout
+    broker.done.wait(args.timeout)
+    while stub_java.count() < len(expected) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    elapsed = time.monotonic() - started
+    sampling[0] = False
+    worker.stop()
+    broker.close()
+
+    latencies = [
+        stub_java.received[g] - broker.dispatched[g]
+        for g in expected
+        if g in stub_java.received and g in broker.dispatched
+    ]
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    if sys.platform == "darwin":
+        rss_kb //= 1024
+
+    report = {
+        "frames": len(frames),
+        "frames_sent": broker.sent,
+        "ws_connections": broker.connections,
+        "groups": len(expected),
+        "delivered": stub_java.count(),
+        "elapsed_s": round(elapsed, 3),
+        "throughput_groups_per_s": round(stub_java.count() / elapsed, 2) if elapsed else None,
+        "latency_p50_s": _percentile(latencies, 0.50),
+        "latency_p99_s": _percentile(latencies, 0.99),
+        "peak_threads": peak_threads[0],
+        "peak_rss_mb": round(rss_kb / 1024, 1),
+        "llm_calls": llm.calls,
+        "geocoder_calls": geocoder.calls,
+        "caches": vm.cache_stats(),
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Record / replay benchmark for the radar worker")
+    sub = parser.add_subparsers(dest="mode", required=True)
+
+    rec = sub.add_parser("record", help="record /topic/groups frames to a JSONL file")
+    rec.add_argument("path")
+    rec.add_argument("--uri", default=os.getenv("WS_URI"))
+    rec.add_argument("--duration", type=float, default=0, help="seconds to record (0 = until Ctrl+C)")
+
+    rep = sub.add_parser("replay", help="replay frames into RadarWorker against local stubs")
+    rep.add_argument("frames", nargs="?", help="JSONL file written by `record`")
+    rep.add_argument("--groups", help="build frames from a users_knn_groups.json-style file instead")
+    rep.add_argument("--batch", type=int, default=0, help="groups per synthetic frame (0 = one frame)")
+    rep.add_argument("--loops", type=int, default=1, help="replay the input this many times with fresh groupIds")
+    rep.add_argument("--rate", type=float, default=0, help="frames per second (0 = recorded timing)")
+    rep.add_argument("--drop-every", type=int, default=0, help="broker drops the connection every N frames (0 = never)")
+    rep.add_argument("--llm-latency", type=float, default=1.5)
+    rep.add_argument("--geo-latency", type=float, default=0.3)
+    rep.add_argument("--geo-miss-rate", type=float, default=0.2)
+    rep.add_argument("--java-latency", type=float, default=0.02)
+    rep.add_argument("--timeout", type=float, default=300)
+    rep.add_argument("--out", help="also write the report as JSON here")
+
+    args = parser.parse_args(argv)
+    if args.mode == "record":
+        if not args.uri:
+            parser.error("--uri or WS_URI is required for record")
+        record(args.path, args.uri, args.duration)
+    else:
+        if not args.frames and not args.groups:
+            parser.error("give a frames file or --groups")
+        replay(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+import asyncio
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+
+from metrics import metrics
+
+# provider -> (requests per second, burst, max concurrent calls)
+PROVIDER_LIMITS = {
+    "photon": (
+        float(os.getenv("PHOTON_RATE", "2")),
+        int(os.getenv("PHOTON_BURST", "2")),
+        int(os.getenv("PHOTON_CONCURRENCY", "2")),
+    ),
+    "openai": (
+        float(os.getenv("OPENAI_RATE", "5")),
+        int(os.getenv("OPENAI_BURST", "10")),
+        int(os.getenv("OPENAI_CONCURRENCY", "8")),
+    ),
+}
+
+# Cooldown after a 429 without Retry-After: base * 2^(consecutive 429s - 1), capped.
+RATE_LIMIT_BACKOFF_BASE = float(os.getenv("RATE_LIMIT_BACKOFF_BASE", "1"))
+RATE_LIMIT_BACKOFF_MAX = float(os.getenv("RATE_LIMIT_BACKOFF_MAX", "60"))
+
+
+def retry_after_from(exc):
+    """Seconds from geopy's GeocoderRateLimited.retry_after or a Retry-After(-ms) response header."""
+    retry_after = getattr(exc, "retry_after", None)
+    if retry_after is not None:
+        try:
+            return float(retry_after)
+        except (TypeError, ValueError):
+            pass
+
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+def is_rate_limited(exc):
+    status = getattr(exc, "status_code", None) or getattr(getattr(exc, "response", None), "status_code", None)
+    return status == 429 or "RateLimit" in type(exc).__name__
+
+
+class ProviderLimiter:
+    """
+    Token bucket + concurrency cap for one upstream provider, shared by every
+    thread (and the event loop) in the process. A 429 puts the whole provider
+    into a cooldown honouring Retry-After, so callers wait instead of piling
+    more requests onto an already throttled API.
+    """
+
+    def __init__(self, name, rate, burst, concurrency):
+        self.name = name
+        self.rate = max(rate, 0.001)
+        self.burst = max(1, burst)
+        self.concurrency = max(1, concurrency)
+
+        self._tokens = float(self.burst)
+        self._updated = time.monotonic()
+        self._cooldown_until = 0.0
+        self._strikes = 0
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def _try_acquire(self):
+        """Take a token and a concurrency slot; 0.0 on success, otherwise seconds to wait."""
+        with self._lock:
+            now = time.monotonic()
+            if now < self._cooldown_until:
+                return self._cooldown_until - now
+
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._active >= self.concurrency:
+                return 0.01
+            if self._tokens < 1.0:
+                return (1.0 - self._tokens) / self.rate
+
+            self._tokens -= 1.0
+            self._active += 1
+            return 0.0
+
+    def _release(self):
+        with self._lock:
+            self._active -= 1
+
+    def penalize(self, retry_after=None):
+        with self._lock:
+            self._strikes += 1
+            if retry_after is None:
+                retry_after = min(RATE_LIMIT_BACKOFF_MAX, RATE_LIMIT_BACKOFF_BASE * 2 ** (self._strikes - 1))
+            self._cooldown_until = max(self._cooldown_until, time.monotonic() + retry_after)
+            self._tokens = 0.0
+        metrics.inc("rate_limited_total", provider=self.name)
+        print(f" [RATE] {self.name} throttled us - cooling down {retry_after:.1f}s")
+
+    def _on_result(self, exc):
+        if exc is not None and is_rate_limited(exc):
+            self.penalize(retry_after_from(exc))
+        elif exc is None and self._strikes:
+            with self._lock:
+                self._strikes = 0
+
+    def _check_wait(self, started, wait, timeout):
+        if timeout is not None and time.monotonic() + wait - started > timeout:
+            metrics.inc("rate_limit_timeouts_total", provider=self.name)
+            raise TimeoutError(f"{self.name} rate limit: no slot within {timeout:.1f}s")
+
+    @contextmanager
+    def slot(self, timeout=None):
+        """Hold a token + concurrency slot; TimeoutError if none is free within `timeout` seconds."""
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                break
+            self._check_wait(started, wait, timeout)
+            time.sleep(wait)
+        metrics.observe("rate_limit_wait_seconds", time.monotonic() - started, provider=self.name)
+
+        try:
+            yield
+        except Exception as e:
+            self._on_result(e)
+            raise
+        else:
+            self._on_result(None)
+        finally:
+            self._release()
+
+    @asynccontextmanager
+    async def aslot(self, timeout=None):
+        started = time.monotonic()
+        while True:
+            wait = self._try_acquire()
+            if not wait:
+                break
+            self._check_wait(started, wait, timeout)
+            await asyncio.sleep(wait)
+        metrics.observe("rate_limit_wait_seconds", time.monotonic() - started, provider=self.name)
+
+        try:
+            yield
+        except Exception as e:
+            self._on_result(e)
+            raise
+        else:
+            self._on_result(None)
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "tokens": round(self._tokens, 2),
+                "active": self._active,
+                "cooldown_s": round(max(0.0, self._cooldown_until - time.monotonic()), 2),
+            }
+
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+def limiter(provider):
+    """Process-wide limiter for `provider` ("photon", "openai"), created on first use."""
+    with _limiters_lock:
+        lim = _limiters.get(provider)
+        if lim is None:
+            rate, burst, concurrency = PROVIDER_LIMITS[provider]
+            lim = _limiters[provider] = ProviderLimiter(provider, rate, burst, concurrency)
+        return lim
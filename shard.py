@@ -0,0 +1,189 @@
+import hashlib
+import json
+import os
+import socket
+import threading
+import time
+from collections import deque
+
+WORKER_SHARD_INDEX = int(os.getenv("WORKER_SHARD_INDEX", "0"))
+WORKER_SHARD_COUNT = int(os.getenv("WORKER_SHARD_COUNT", "1"))
+# Shared directory (e.g. a network mount) for lease files; without it the shard split is static.
+WORKER_LEASE_DIR = os.getenv("WORKER_LEASE_DIR")
+WORKER_LEASE_TTL = float(os.getenv("WORKER_LEASE_TTL", "15"))
+# Foreign groups kept for a possible takeover (see ShardMembership.hold).
+WORKER_SHARD_HOLD_MAX = int(os.getenv("WORKER_SHARD_HOLD_MAX", "5000"))
+
+
+def shard_local(path, index=WORKER_SHARD_INDEX, count=WORKER_SHARD_COUNT):
+    """Per-shard name for a local state file (java_spool.jsonl -> java_spool.shard-1.jsonl),
+    so shards running on one host never share a SQLite db, spool or cache file."""
+    if not path or count <= 1:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.shard-{index}{ext}"
+
+
+def shard_port(port, index=WORKER_SHARD_INDEX, count=WORKER_SHARD_COUNT):
+    """Per-shard port: shard i listens on port + i, so shards on one host don't collide."""
+    if not port or count <= 1:
+        return port
+    return port + index
+
+
+def _score(shard, group_id):
+    digest = hashlib.blake2b(f"{shard}:{group_id}".encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big")
+
+
+def owner_of(group_id, shards):
+    """Rendezvous (highest random weight) hashing: stable across processes, and when a
+    shard leaves only its own groups move - each to the shard ranked next for it."""
+    return max(shards, key=lambda shard: _score(shard, group_id))
+
+
+class ShardMembership:
+    """
+    Decides which groups this worker instance handles.
+
+    Every instance still receives the whole /topic/groups stream and keeps only
+    the groups whose groupId hashes to it. With `lease_dir` set, each instance
+    refreshes shard-<index>.lease every ttl/3 seconds; shards whose lease is
+    older than `ttl` are considered dead and their groups are taken over by the
+    remaining ones until they come back.
+
+    A dead shard is only noticed once its lease is older than `ttl`, and the
+    groups published in that window were already skipped by everyone else.
+    To not lose them each instance hold()s the foreign groups it skips for
+    2 * ttl; when a shard drops out, the held groups that now hash to this
+    instance are passed to `on_takeover`. A group the dead shard finished
+    right before dying can therefore be processed twice (at-least-once).
+    """
+
+    def __init__(
+        self,
+        index=WORKER_SHARD_INDEX,
+        count=WORKER_SHARD_COUNT,
+        lease_dir=WORKER_LEASE_DIR,
+        ttl=WORKER_LEASE_TTL,
+        hold_max=WORKER_SHARD_HOLD_MAX,
+    ):
+        self.count = max(1, count)
+        if not 0 <= index < self.count:
+            raise ValueError(f"WORKER_SHARD_INDEX={index} outside 0..{self.count - 1}")
+        self.index = index
+        self.lease_dir = lease_dir if self.count > 1 else None
+        self.ttl = ttl
+
+        self._live = tuple(range(self.count))
+        self._started = time.time()
+        self._stop = threading.Event()
+        self._thread = None
+
+        self._held = deque(maxlen=max(1, hold_max))
+        self._held_lock = threading.Lock()
+        # Called from the lease thread with the list of groups taken over from a dead shard.
+        self.on_takeover = None
+
+    @property
+    def enabled(self):
+        return self.count > 1
+
+    @property
+    def live(self):
+        return self._live
+
+    def owns(self, group_id):
+        if not self.enabled:
+            return True
+        return owner_of(group_id, self._live) == self.index
+
+    def hold(self, group):
+        """Remember a group owned by another shard, in case that shard turns out to be dead."""
+        if not self.lease_dir:
+            return
+        now = time.time()
+        with self._held_lock:
+            self._held.append((now, group))
+            while self._held and now - self._held[0][0] > 2 * self.ttl:
+                self._held.popleft()
+
+    def start(self):
+        if not self.enabled:
+            return
+        print(f" [SHARD] Shard {self.index}/{self.count}" + (f", leases in {self.lease_dir}" if self.lease_dir else " (static)"))
+        if not self.lease_dir:
+            return
+        os.makedirs(self.lease_dir, exist_ok=True)
+        self._started = time.time()
+        self._heartbeat()
+        self._thread = threading.Thread(target=self._loop, name="shard-lease", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=self.ttl)
+            self._thread = None
+            try:
+                os.remove(self._lease_path(self.index))
+            except OSError:
+                pass
+
+    def stats(self):
+        with self._held_lock:
+            held = len(self._held)
+        return {"index": self.index, "count": self.count, "live": list(self._live), "held": held}
+
+    def _lease_path(self, shard):
+        return os.path.join(self.lease_dir, f"shard-{shard}.lease")
+
+    def _loop(self):
+        while not self._stop.wait(self.ttl / 3):
+            try:
+                self._heartbeat()
+            except OSError as e:
+                print(f" [SHARD] Lease refresh failed: {e}")
+
+    def _heartbeat(self):
+        path = self._lease_path(self.index)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({"shard": self.index, "host": socket.gethostname(), "pid": os.getpid(), "ts": time.time()}, f)
+        os.replace(tmp, path)
+
+        live = [self.index]
+        now = time.time()
+        for shard in range(self.count):
+            if shard == self.index:
+                continue
+            try:
+                alive = now - os.path.getmtime(self._lease_path(shard)) <= self.ttl
+            except OSError:
+                # No lease yet: give peers one ttl after our own start before taking their groups.
+                alive = now - self._started <= self.ttl
+            if alive:
+                live.append(shard)
+
+        live = tuple(sorted(live))
+        if live != self._live:
+            print(f" [SHARD] Live shards changed: {list(self._live)} -> {list(live)}")
+            previous, self._live = self._live, live
+            dead = set(previous) - set(live)
+            if dead:
+                self._take_over(previous, dead)
+
+    def _take_over(self, previous, dead):
+        taken, kept = [], []
+        with self._held_lock:
+            for received, group in self._held:
+                group_id = group.get("groupId")
+                if owner_of(group_id, previous) in dead and self.owns(group_id):
+                    taken.append(group)
+                else:
+                    kept.append((received, group))
+            self._held.clear()
+            self._held.extend(kept)
+        if taken and self.on_takeover:
+            print(f" [SHARD] Taking over {len(taken)} recent group(s) from shard(s) {sorted(dead)}")
+            self.on_takeover(taken)
@@ -0,0 +1,102 @@
+import asyncio
+import threading
+
+from deadline import DeadlineExceeded, current_deadline
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: the first caller runs fn,
+    everyone arriving while it is in flight waits and gets the same result
+    (or the same exception). Nothing is kept once the call finishes.
+    A waiting caller gives up with DeadlineExceeded when its own deadline runs out.
+    """
+
+    def __init__(self, name="single-flight"):
+        self.name = name
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.executions = 0
+
+    def do(self, key, fn, *args):
+        with self._lock:
+            self.calls += 1
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+                self.executions += 1
+
+        if not leader:
+            if not call.done.wait(timeout=current_deadline().remaining()):
+                raise DeadlineExceeded(f"{self.name}: deadline exceeded waiting for {key}")
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args)
+            return call.result
+        except Exception as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self):
+        with self._lock:
+            shared = self.calls - self.executions
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "shared": shared,
+                "in_flight": len(self._calls),
+                "dedup_ratio": round(shared / self.calls, 4) if self.calls else 0.0,
+            }
+
+
+class AsyncSingleFlight(SingleFlight):
+    """SingleFlight for coroutines running on one event loop."""
+
+    async def do(self, key, fn, *args):
+        with self._lock:
+            self.calls += 1
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = asyncio.get_running_loop().create_future()
+                self._calls[key] = future
+                self.executions += 1
+
+        if not leader:
+            try:
+                return await asyncio.wait_for(asyncio.shield(future), timeout=current_deadline().remaining())
+            except asyncio.TimeoutError:
+                raise DeadlineExceeded(f"{self.name}: deadline exceeded waiting for {key}") from None
+
+        try:
+            result = await fn(*args)
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Mark retrieved so a lonely leader does not log "exception never retrieved".
+            future.exception()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
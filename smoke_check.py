@@ -0,0 +1,71 @@
+"""
+Construction smoke check for the worker.
+
+Builds the objects a worker builds before it connects anywhere - the venue
+manager (caches, single-flight, gauges) and RadarWorker - with state files in
+a temporary directory, then renders /metrics once. Catches constructors that
+raise, which would otherwise only show up as every group failing at runtime.
+
+  python smoke_check.py
+"""
+
+import os
+import sys
+import tempfile
+import traceback
+
+EXPECTED_GAUGES = ("singleflight_calls", "singleflight_shared", "cache_hits", "cache_misses", "cache_evictions")
+
+
+def main():
+    workdir = tempfile.mkdtemp(prefix="radar_smoke_")
+    # Config is read at import time; keep the check away from real state files and ports.
+    os.environ.update({
+        "PROCESSED_GROUPS_DB": os.path.join(workdir, "processed.db"),
+        "JAVA_SPOOL_PATH": os.path.join(workdir, "spool.jsonl"),
+        "REVERSE_CACHE_PATH": "",
+        "FORWARD_CACHE_PATH": "",
+        "METRICS_PORT": "0",
+        "METRICS_LOG_INTERVAL": "0",
+    })
+
+    checks = []
+
+    def check(name, fn):
+        try:
+            fn()
+        except Exception:
+            print(f" [SMOKE] {name:<28} FAIL")
+            traceback.print_exc()
+            checks.append(False)
+        else:
+            print(f" [SMOKE] {name:<28} ok")
+            checks.append(True)
+
+    def venue_manager():
+        from venue_manager import get_venue_manager
+
+        get_venue_manager().cache_stats()
+
+    def radar_worker():
+        from worker import RadarWorker
+
+        worker = RadarWorker()
+        worker.group_store.close()
+
+    def metrics_render():
+        from metrics import metrics
+
+        text = metrics.render_prometheus()
+        missing = [name for name in EXPECTED_GAUGES if name not in text]
+        if missing:
+            raise AssertionError(f"gauges missing from /metrics: {missing}")
+
+    check("VenueManager", venue_manager)
+    check("RadarWorker", radar_worker)
+    check("metrics render", metrics_render)
+    return 0 if all(checks) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
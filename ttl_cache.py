@@ -0,0 +1,146 @@
+import asyncio
+import atexit
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache with per-entry expiry.
+
+    Keys must be strings and values JSON-serialisable when `path` is set:
+    the cache is then loaded from that file on start, saved every
+    `save_every` writes and once more at interpreter exit. A save due while
+    an event loop is running goes to the default executor, off the loop.
+    """
+
+    def __init__(self, max_entries=1000, ttl=3600, path=None, save_every=20, name="cache"):
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.path = path
+        self.save_every = max(1, save_every)
+        self.name = name
+
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._save_lock = threading.Lock()
+        self._dirty = 0
+        self._save_scheduled = False
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        if path:
+            self.load()
+            atexit.register(self.save)
+
+    def get(self, key, default=None):
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            expires_at, value = entry
+            if expires_at < now:
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def peek(self, key, default=None):
+        """Like get(), but does not touch LRU order or hit/miss counters."""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.time():
+                return default
+            return entry[1]
+
+    def touch(self, key):
+        """Mark key as recently used without counting a hit or miss."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+
+    def put(self, key, value, ttl=None):
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+            self._dirty += 1
+            should_save = self.path and self._dirty >= self.save_every and not self._save_scheduled
+            if should_save:
+                self._save_scheduled = True
+        if should_save:
+            self._save_soon()
+
+    def _save_soon(self):
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.save()
+            return
+        loop.run_in_executor(None, self.save)
+
+    def __len__(self):
+        with self._lock:
+            return len(self._data)
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f" [{self.name.upper()}] Could not load {self.path}: {e}")
+            return
+
+        now = time.time()
+        entries = sorted(
+            ((key, expires_at, value) for key, (expires_at, value) in raw.items() if expires_at >= now),
+            key=lambda e: e[1],
+        )
+        with self._lock:
+            for key, expires_at, value in entries[-self.max_entries:]:
+                self._data[key] = (expires_at, value)
+        print(f" [{self.name.upper()}] Loaded {len(entries)} entries from {self.path}")
+
+    def save(self):
+        if not self.path:
+            return
+        with self._lock:
+            snapshot = {key: [expires_at, value] for key, (expires_at, value) in self._data.items()}
+            self._dirty = 0
+            self._save_scheduled = False
+
+        tmp_path = self.path + ".tmp"
+        with self._save_lock:
+            try:
+                with open(tmp_path, "w", encoding="utf-8") as f:
+                    json.dump(snapshot, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                print(f" [{self.name.upper()}] Could not save {self.path}: {e}")
@@ -1,18 +1,30 @@
 # config.py
 import os
+from functools import lru_cache
+
 from dotenv import load_dotenv
-from openai import OpenAI
 
 load_dotenv()
 
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise RuntimeError("Brak zmiennej środowiskowej OPENAI_API_KEY (sprawdź plik .env)")
-
-client = OpenAI(api_key=OPENAI_API_KEY)
-
 JAVA_BASE_URL = os.getenv("JAVA_BASE_URL")
-if not JAVA_BASE_URL:
-    raise RuntimeError("Brak zmiennej środowiskowej JAVA_BASE_URL (dodaj do .env)")
 
 WS_URI = os.getenv("WS_URI", "wss://continuable-manuela-podgy.ngrok-free.dev/ws")
+
+
+def check_config() -> None:
+    """Wymagane zmienne środowiskowe – sprawdzane przy starcie serwisu (lifespan), nie przy imporcie."""
+    if not OPENAI_API_KEY:
+        raise RuntimeError("Brak zmiennej środowiskowej OPENAI_API_KEY (sprawdź plik .env)")
+    if not JAVA_BASE_URL:
+        raise RuntimeError("Brak zmiennej środowiskowej JAVA_BASE_URL (dodaj do .env)")
+
+
+@lru_cache(maxsize=1)
+def get_client():
+    """Klient OpenAI tworzony przy pierwszym użyciu (sam import openai trwa kilkaset ms)."""
+    from openai import OpenAI
+
+    if not OPENAI_API_KEY:
+        raise RuntimeError("Brak zmiennej środowiskowej OPENAI_API_KEY (sprawdź plik .env)")
+    return OpenAI(api_key=OPENAI_API_KEY)
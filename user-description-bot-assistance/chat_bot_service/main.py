@@ -1,6 +1,7 @@
 import json
 import threading
 import time
+from contextlib import asynccontextmanager
 from textwrap import dedent
 from typing import Optional, List, Dict, Tuple
 
@@ -8,13 +9,26 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 import websocket  # klient WebSocket/STOMP
 
-from config import client, WS_URI
-from traits import send_final_description_to_backend
+from stomp_codec import StompDecoder, StompError
+
+from .config import check_config, get_client, WS_URI
+from .traits import send_final_description_to_backend
 
 
 # ================== FASTAPI APP ==================
 
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Konfiguracja i wątek WS startują razem z serwerem, a nie przy imporcie modułu.
+    check_config()
+    ws_client.start()
+    yield
+    ws_client.stop()
+
+
 app = FastAPI(
+    lifespan=lifespan,
     title="ProfilBot Conversation API",
     description="Dynamiczny bot do rozmowy i iteracyjnego budowania opisu profilu",
     version="0.4.1",
@@ -65,12 +79,18 @@ class WebSocketClient:
         self.ws: Optional[websocket.WebSocketApp] = None
         self.connected = False
         self.running = True
+        self.decoder = StompDecoder()
         self.thread = threading.Thread(target=self._run_loop, daemon=True)
 
     def start(self):
         self.thread.start()
         print("🚀 [WS] Klient WebSocket uruchomiony w tle.")
 
+    def stop(self):
+        self.running = False
+        if self.ws:
+            self.ws.close()
+
     def _run_loop(self):
         while self.running:
             try:
@@ -93,6 +113,7 @@ class WebSocketClient:
     def on_open(self, ws):
         print("✅ [WS] Połączono z serwerem.")
         self.connected = True
+        self.decoder.reset()
 
         connect_frame = stomp_frame(
             "CONNECT",
@@ -115,16 +136,19 @@ class WebSocketClient:
         print("🎧 [WS] Zasubskrybowano /topic/description")
 
     def on_message(self, ws, message: str):
-        if message == "\n":
-            return
-
-        if "\n\n" not in message:
-            print(f"📩 [WS RAW]: {message!r}")
+        try:
+            frames = self.decoder.feed(message)
+        except StompError as e:
+            print(f"⚠️ [WS] Niepoprawna ramka STOMP: {e}")
             return
 
-        header, body = message.split("\n\n", 1)
-        clean_body = body.replace("\x00", "").strip()
+        for frame in frames:
+            if frame.command != "MESSAGE":
+                print(f"📩 [WS {frame.command}]: {frame.headers}")
+                continue
+            self.handle_message_body(frame.text.strip())
 
+    def handle_message_body(self, clean_body: str):
         if not clean_body:
             return
 
@@ -218,9 +242,8 @@ class WebSocketClient:
             print("⚠️ [WS] Nie można wysłać - brak połączenia.")
 
 
-# Inicjalizacja klienta WS
+# Klient WS – wątek startuje w lifespan()
 ws_client = WebSocketClient(WS_URI)
-ws_client.start()
 
 
 # ================== FUNKCJA BOTA – iteracyjne budowanie opisu ==================
@@ -308,7 +331,7 @@ def refine_description_with_openai(
     print(f"[FLOW] last_answer:  {last_answer}")
     print(f"[FLOW] prev_description: {description}\n")
 
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
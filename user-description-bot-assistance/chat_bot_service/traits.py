@@ -8,7 +8,7 @@ import numpy as np
 import requests
 from pydantic import BaseModel
 
-from config import client, JAVA_BASE_URL
+from .config import get_client, JAVA_BASE_URL
 
 
 class ProfileFeatures(BaseModel):
@@ -84,7 +84,7 @@ def extract_features_from_description(description: str) -> ProfileFeatures:
 
     print(f"[LOG] Ekstrakcja cech z opisu (finalDescription):\n{description}\n")
 
-    response = client.chat.completions.create(
+    response = get_client().chat.completions.create(
         model="gpt-4o-mini",
         messages=[
             {"role": "system", "content": system_prompt},
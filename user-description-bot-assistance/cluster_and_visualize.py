@@ -1,11 +1,10 @@
 import json
-from typing import List, Dict
+from typing import List, Dict, Optional
 
 import numpy as np
-from sklearn.cluster import KMeans
-from sklearn.metrics import silhouette_score
-import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches  # <-- nowy import
+
+from knn_grouping.config import K_SWEEP_WORKERS
+from knn_grouping.parallel_sweep import SweepPool
 
 
 # ===== HELPERY DO TAGÓW =====
@@ -52,9 +51,32 @@ def vector_to_readable_dict(v: np.ndarray, tag_index: Dict[str, int]) -> Dict[st
 
 # ===== WYBÓR LICZBY KLASTRÓW =====
 
-def choose_best_k(X: np.ndarray, k_min: int = 2, k_max: int = 10) -> int:
+def silhouette_for_k(X: np.ndarray, k: int) -> Optional[float]:
+    """
+    K-means dla jednego k i jego silhouette score (None, gdy wyszedł jeden klaster).
+    Funkcja z poziomu modułu, żeby dało się ją wysłać do procesów SweepPool.
+    """
+    from sklearn.cluster import KMeans
+    from sklearn.metrics import silhouette_score
+
+    kmeans = KMeans(n_clusters=k, random_state=42, n_init=100)
+    labels = kmeans.fit_predict(X)
+
+    if len(set(labels)) < 2:
+        print(f"k={k}: tylko jeden klaster, pomijam silhouette.")
+        return None
+
+    score = silhouette_score(X, labels)
+    print(f"k={k}: silhouette_score = {score:.4f}")
+    return score
+
+
+def choose_best_k(X: np.ndarray, k_min: int = 2, k_max: int = 10, workers: Optional[int] = None) -> int:
     """
     Wybiera najlepszą liczbę klastrów na podstawie silhouette score.
+    Kolejne k liczone są równolegle w puli procesów (domyślnie K_SWEEP_WORKERS,
+    nigdy więcej niż liczba k; workers=1 – szeregowo); wynik jest taki sam
+    jak przy przeglądzie szeregowym.
     """
     n_samples = X.shape[0]
 
@@ -67,17 +89,15 @@ def choose_best_k(X: np.ndarray, k_min: int = 2, k_max: int = 10) -> int:
     best_score = -1.0
 
     print("=== Szukanie najlepszego k (silhouette score) ===")
-    for k in range(k_min, max_k_allowed + 1):
-        kmeans = KMeans(n_clusters=k, random_state=42, n_init=100)
-        labels = kmeans.fit_predict(X)
+    ks = list(range(k_min, max_k_allowed + 1))
+    workers = min(K_SWEEP_WORKERS if workers is None else workers, len(ks))
+    with SweepPool(X, workers=workers) as pool:
+        scores = pool.map(silhouette_for_k, ks)
 
-        if len(set(labels)) < 2:
-            print(f"k={k}: tylko jeden klaster, pomijam silhouette.")
+    for k, score in zip(ks, scores):
+        if score is None:
             continue
 
-        score = silhouette_score(X, labels)
-        print(f"k={k}: silhouette_score = {score:.4f}")
-
         if score > best_score:
             best_score = score
             best_k = k
@@ -89,6 +109,8 @@ def choose_best_k(X: np.ndarray, k_min: int = 2, k_max: int = 10) -> int:
 # ===== ODCZYT PLIKU, K-MEANS I WIZUALIZACJA =====
 
 if __name__ == "__main__":
+    from sklearn.cluster import KMeans
+
     input_path = "profiles_vectors_augmented.txt"
     print(f"=== K-means na profilach z pliku {input_path} ===\n")
 
@@ -190,6 +212,10 @@ if __name__ == "__main__":
     if idx_lat is None or idx_lon is None:
         print("Brak 'lat' lub 'lon' w cechach – nie mogę zrobić wykresu współrzędnych.")
     else:
+        # matplotlib tylko dla wykresu – nie spowalnia importu modułu
+        import matplotlib.pyplot as plt
+        import matplotlib.patches as mpatches
+
         lats = X[:, idx_lat]
         lons = X[:, idx_lon]
 
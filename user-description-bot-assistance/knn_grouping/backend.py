@@ -4,11 +4,11 @@ from typing import Any, List, Optional
 
 import requests
 
-from .config import JAVA_BASE_URL, FEATURES_PATH
+from .config import FEATURES_PATH, require_java_base_url
 
 
 def fetch_features_from_backend() -> Optional[List[dict]]:
-    url = f"{JAVA_BASE_URL}{FEATURES_PATH}"
+    url = f"{require_java_base_url()}{FEATURES_PATH}"
     print(f"[HTTP] GET {url}")
 
     try:
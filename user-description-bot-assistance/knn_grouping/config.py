@@ -5,15 +5,60 @@ from dotenv import load_dotenv
 load_dotenv()
 
 JAVA_BASE_URL = os.getenv("JAVA_BASE_URL")
-if not JAVA_BASE_URL:
-    raise RuntimeError("Brak zmiennej środowiskowej JAVA_BASE_URL (dodaj do .env)")
 
 FEATURES_PATH = "/api/users/features"
 OUTPUT_GROUPS_FILE = "users_knn_groups.json"
 
 GEO_WEIGHT = 3.0
 
+# Podział userów na regiony (siatka o boku GEO_SHARD_CELL_KM) grupowane osobno,
+# równolegle w GEO_SHARD_WORKERS procesach – bez grup z userami z różnych miast.
+# Domyślnie wyłączone: userzy po dwóch stronach granicy komórki nie trafią do
+# jednej grupy, nawet gdy mieszkają kilometr od siebie. Włączać (GEO_SHARDING=1)
+# dla dużych, rozproszonych zbiorów, gdzie liczy się czas grupowania.
+GEO_SHARDING = os.getenv("GEO_SHARDING", "0") == "1"
+GEO_SHARD_CELL_KM = float(os.getenv("GEO_SHARD_CELL_KM", "50"))
+GEO_SHARD_WORKERS = int(os.getenv("GEO_SHARD_WORKERS", str(os.cpu_count() or 1)))
+
 MIN_CLUSTER_RATIO = 0.14
 MAX_CLUSTER_RATIO = 0.35
 
+MIN_GROUP_SIZE = 3
+MAX_GROUP_SIZE = 8
+# Grupowanie z limitami rozmiaru: do ilu najbliższych centroidów user może trafić
+# i ile rund (przydział -> dopełnienie -> nowe centroidy) maksymalnie robimy.
+CONSTRAINED_CANDIDATES = int(os.getenv("CONSTRAINED_CANDIDATES", "8"))
+CONSTRAINED_ITERATIONS = int(os.getenv("CONSTRAINED_ITERATIONS", "10"))
+
+# Wybór k: "fast" (próbkowany silhouette + przeszukiwanie zgrubne -> dokładne)
+# albo "exact" (pełny przegląd k z pełnym silhouette, jak dawniej).
+K_SELECTION_MODE = os.getenv("K_SELECTION_MODE", "fast")
+# "sampled" (silhouette dla próbki userów liczony względem wszystkich)
+# albo "simplified" (odległości do centroidów zamiast do wszystkich punktów).
+SILHOUETTE_METHOD = os.getenv("SILHOUETTE_METHOD", "sampled")
+SILHOUETTE_SAMPLE_SIZE = int(os.getenv("SILHOUETTE_SAMPLE_SIZE", "2000"))
+# Ile wartości k sprawdzamy na każdym poziomie przeszukiwania.
+K_SEARCH_STEPS = int(os.getenv("K_SEARCH_STEPS", "6"))
+# Od tylu userów KMeans zastępujemy MiniBatchKMeans.
+MINIBATCH_MIN_USERS = int(os.getenv("MINIBATCH_MIN_USERS", "10000"))
+
+# Równoległy przegląd k: liczba procesów i wątków BLAS/OpenMP na proces.
+# Każdy proces to osobny import sklearn i kopia stanu KMeans, więc domyślnie najwyżej 4.
+K_SWEEP_WORKERS = int(os.getenv("K_SWEEP_WORKERS", str(min(4, os.cpu_count() or 1))))
+K_SWEEP_THREADS = int(os.getenv("K_SWEEP_THREADS", "1"))
+# Poniżej tylu userów start procesów (import sklearn w każdym) kosztuje więcej niż zysk.
+K_SWEEP_MIN_USERS = int(os.getenv("K_SWEEP_MIN_USERS", "2000"))
+
+# Warm start: k+1 startuje z centroidów k (dzielimy klaster o największym SSE),
+# w łańcuchach po K_WARM_CHAIN kolejnych k. Tylko w trybie fast – exact zawsze liczy każde k od zera.
+K_WARM_START = os.getenv("K_WARM_START", "1") == "1"
+K_WARM_CHAIN = int(os.getenv("K_WARM_CHAIN", "16"))
+
 WS_URI = os.getenv("WS_URI", "wss://continuable-manuela-podgy.ngrok-free.dev/ws")
+
+
+def require_java_base_url() -> str:
+    # Sprawdzane przy pierwszym użyciu, żeby import pakietu (testy, CLI) nie wymagał .env.
+    if not JAVA_BASE_URL:
+        raise RuntimeError("Brak zmiennej środowiskowej JAVA_BASE_URL (dodaj do .env)")
+    return JAVA_BASE_URL
@@ -0,0 +1,179 @@
+# knn_grouping/constrained.py
+import math
+from typing import List, Tuple
+
+import numpy as np
+
+from .config import CONSTRAINED_CANDIDATES, CONSTRAINED_ITERATIONS, MAX_GROUP_SIZE, MIN_GROUP_SIZE
+
+
+def _nearest_centers(matrix: np.ndarray, centers: np.ndarray, count: int) -> Tuple[np.ndarray, np.ndarray]:
+    from sklearn.neighbors import NearestNeighbors
+
+    count = min(count, len(centers))
+    nn = NearestNeighbors(n_neighbors=count).fit(centers)
+    dist, idx = nn.kneighbors(matrix)
+    return dist, idx
+
+
+def _assign_with_capacity(
+    matrix: np.ndarray,
+    centers: np.ndarray,
+    cand_dist: np.ndarray,
+    cand_idx: np.ndarray,
+    max_size: int,
+) -> np.ndarray:
+    """
+    Przydział z limitem max_size na grupę, rundami: w rundzie r każdy nieprzydzielony
+    user zgłasza się do swojego r-tego najbliższego centroidu, a centroid przyjmuje
+    najbliższych zgłoszonych, dopóki ma miejsce. Wszystko wektorowo na tablicach.
+    """
+    n, rounds = cand_idx.shape
+    num_groups = len(centers)
+    labels = np.full(n, -1, dtype=np.int64)
+    load = np.zeros(num_groups, dtype=np.int64)
+
+    for r in range(rounds):
+        pending = np.flatnonzero(labels < 0)
+        if len(pending) == 0:
+            break
+        g = cand_idx[pending, r]
+        # Kolejność: centroid, odległość, numer usera (deterministycznie przy remisach).
+        order = np.lexsort((pending, cand_dist[pending, r], g))
+        pending, g = pending[order], g[order]
+        rank = np.arange(len(g)) - np.searchsorted(g, g, side="left")
+        accepted = rank < (max_size - load[g])
+        labels[pending[accepted]] = g[accepted]
+        load += np.bincount(g[accepted], minlength=num_groups)
+
+    # Wszyscy kandydaci pełni (rzadkie) – najbliższa grupa z wolnym miejscem spośród wszystkich.
+    for p in np.flatnonzero(labels < 0):
+        d = np.linalg.norm(centers - matrix[p], axis=1)
+        d[load >= max_size] = np.inf
+        g = int(np.argmin(d))
+        labels[p] = g
+        load[g] += 1
+
+    return labels
+
+
+def _fill_small_groups(
+    matrix: np.ndarray,
+    centers: np.ndarray,
+    labels: np.ndarray,
+    cand_idx: np.ndarray,
+    min_size: int,
+) -> np.ndarray:
+    """
+    Grupy poniżej min_size dobierają userów z grup, które mają ich więcej niż min_size,
+    biorąc tych, dla których przeniesienie najmniej zwiększa odległość do centroidu.
+    Przy num_groups <= n / min_size nadwyżek zawsze wystarcza.
+    """
+    num_groups = len(centers)
+    load = np.bincount(labels, minlength=num_groups)
+    small = np.flatnonzero(load < min_size)
+    if len(small) == 0:
+        return labels
+
+    own_dist = np.linalg.norm(matrix - centers[labels], axis=1)
+    # Odwrotny indeks kandydatów: centroid -> userzy, którzy mają go wśród najbliższych.
+    flat = cand_idx.ravel()
+    order = np.argsort(flat, kind="stable")
+    bounds = np.searchsorted(flat[order], np.arange(num_groups + 1))
+    rounds = cand_idx.shape[1]
+
+    # Najpierw najmniejsze grupy – mają najmniej naturalnych kandydatów.
+    for g in small[np.argsort(load[small], kind="stable")]:
+        users = order[bounds[g]:bounds[g + 1]] // rounds
+        for attempt in range(2):
+            need = min_size - load[g]
+            if need <= 0:
+                break
+            if attempt == 1:
+                # Za mało kandydatów z listy najbliższych – bierzemy pod uwagę wszystkich.
+                users = np.arange(len(labels))
+            users = users[(labels[users] != g) & (load[labels[users]] > min_size)]
+            if len(users) == 0:
+                continue
+            cost = np.linalg.norm(matrix[users] - centers[g], axis=1) - own_dist[users]
+            for p in users[np.lexsort((users, cost))]:
+                if need == 0:
+                    break
+                donor = labels[p]
+                # Dawca może już nie mieć nadwyżki po wcześniejszych przeniesieniach.
+                if load[donor] <= min_size:
+                    continue
+                labels[p] = g
+                load[donor] -= 1
+                load[g] += 1
+                need -= 1
+
+    return labels
+
+
+def _initial_centers(matrix: np.ndarray, centers: np.ndarray, labels: np.ndarray, num_groups: int) -> np.ndarray:
+    if len(centers) > num_groups:
+        # Zostają centroidy najliczniejszych klastrów.
+        sizes = np.bincount(labels, minlength=len(centers))
+        keep = np.sort(np.argsort(-sizes, kind="stable")[:num_groups])
+        return centers[keep]
+    if len(centers) < num_groups:
+        from .k_selection import split_highest_sse
+
+        return split_highest_sse(matrix, labels, centers, num_groups)
+    return centers
+
+
+def _group_means(matrix: np.ndarray, labels: np.ndarray, num_groups: int) -> np.ndarray:
+    order = np.argsort(labels, kind="stable")
+    starts = np.searchsorted(labels[order], np.arange(num_groups))
+    sums = np.add.reduceat(matrix[order], starts, axis=0)
+    return sums / np.bincount(labels, minlength=num_groups)[:, None]
+
+
+def constrained_groups(
+    matrix: np.ndarray,
+    centers: np.ndarray,
+    labels: np.ndarray,
+    min_size: int = MIN_GROUP_SIZE,
+    max_size: int = MAX_GROUP_SIZE,
+    candidates: int = CONSTRAINED_CANDIDATES,
+    iterations: int = CONSTRAINED_ITERATIONS,
+) -> np.ndarray:
+    """
+    K-means z pojemnościami: zwraca etykiety grup, w których każda grupa ma
+    min_size..max_size userów. Startuje z centroidów wybranego k, potem na zmianę:
+    przydział z limitem max_size (tylko do `candidates` najbliższych centroidów),
+    dopełnienie grup poniżej min_size najtańszymi przeniesieniami, przeliczenie
+    centroidów. Bez losowości – te same dane dają te same grupy.
+    """
+    n = matrix.shape[0]
+    if n <= max_size:
+        return np.zeros(n, dtype=np.int64)
+
+    num_groups = min(max(len(centers), math.ceil(n / max_size)), n // min_size)
+    centers = _initial_centers(matrix, np.asarray(centers, dtype=float), labels, num_groups)
+    candidates = min(max(candidates, 2), num_groups)
+
+    best_labels, best_cost = None, np.inf
+    for it in range(max(1, iterations)):
+        cand_dist, cand_idx = _nearest_centers(matrix, centers, candidates)
+        new_labels = _assign_with_capacity(matrix, centers, cand_dist, cand_idx, max_size)
+        new_labels = _fill_small_groups(matrix, centers, new_labels, cand_idx, min_size)
+
+        centers = _group_means(matrix, new_labels, num_groups)
+        cost = float(np.linalg.norm(matrix - centers[new_labels], axis=1).sum())
+        print(f"[GROUPS] Iteracja {it + 1}: suma odległości do centroidów={cost:.4f}")
+
+        # Brak poprawy (także: te same etykiety co poprzednio) – koniec.
+        if best_labels is not None and cost >= best_cost:
+            break
+        best_labels, best_cost = new_labels, cost
+
+    return best_labels
+
+
+def labels_to_groups(labels: np.ndarray, user_ids: List[int]) -> List[List[int]]:
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(int(labels.max()) + 2))
+    return [[user_ids[i] for i in order[bounds[g]:bounds[g + 1]]] for g in range(len(bounds) - 1)]
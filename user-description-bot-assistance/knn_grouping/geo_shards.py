@@ -0,0 +1,111 @@
+# knn_grouping/geo_shards.py
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from typing import List
+
+import numpy as np
+
+from .clustering import compute_kmeans_groups
+from .config import GEO_SHARD_CELL_KM, GEO_SHARD_WORKERS, MIN_GROUP_SIZE
+from .parallel_sweep import limit_process_threads
+
+KM_PER_DEGREE = 111.32
+
+
+def _grid_cells(lats: np.ndarray, lons: np.ndarray, cell_km: float) -> np.ndarray:
+    cell_deg = cell_km / KM_PER_DEGREE
+    rows = np.floor((lats + 90.0) / cell_deg)
+    # Stopień długości geograficznej maleje ku biegunom – komórka ma mieć ~cell_km także w poziomie.
+    row_lat = -90.0 + (rows + 0.5) * cell_deg
+    lon_deg = cell_deg / np.maximum(np.cos(np.radians(row_lat)), 0.01)
+    cols = np.floor((lons + 180.0) / lon_deg)
+    return np.stack([rows, cols], axis=1).astype(np.int64)
+
+
+def partition_users(
+    lats: np.ndarray,
+    lons: np.ndarray,
+    cell_km: float = GEO_SHARD_CELL_KM,
+    min_users: int = MIN_GROUP_SIZE,
+) -> List[np.ndarray]:
+    """
+    Indeksy userów podzielone na regiony: komórki siatki o boku ~cell_km.
+    Komórki z mniej niż min_users userami (z nich nie da się złożyć grupy)
+    dołączamy do najbliższej większej. Kolejność regionów stała (wg komórki).
+    """
+    n = len(lats)
+    if n == 0:
+        return []
+    _, cell_of = np.unique(_grid_cells(lats, lons, cell_km), axis=0, return_inverse=True)
+    cell_of = cell_of.ravel()
+
+    order = np.argsort(cell_of, kind="stable")
+    bounds = np.searchsorted(cell_of[order], np.arange(int(cell_of.max()) + 2))
+    members = [order[bounds[c]:bounds[c + 1]] for c in range(len(bounds) - 1)]
+
+    big = [c for c, m in enumerate(members) if len(m) >= min_users]
+    if len(big) <= 1:
+        return [np.arange(n)]
+
+    # Środki regionów w km (rzut równoodległościowy wystarcza do wyboru najbliższego).
+    def center_km(m):
+        lat = float(lats[m].mean())
+        return np.array([lat * KM_PER_DEGREE, float(lons[m].mean()) * KM_PER_DEGREE * np.cos(np.radians(lat))])
+
+    big_centers = np.vstack([center_km(members[c]) for c in big])
+    merged = {c: [members[c]] for c in big}
+    for c, m in enumerate(members):
+        if len(m) < min_users:
+            nearest = big[int(np.argmin(np.linalg.norm(big_centers - center_km(m), axis=1)))]
+            merged[nearest].append(m)
+
+    return [np.sort(np.concatenate(merged[c])) for c in big]
+
+
+def _cluster_shard(matrix: np.ndarray, user_ids: List[int]) -> List[List[int]]:
+    # Równolegle idą regiony, więc przegląd k w środku jest szeregowy (bez zagnieżdżonej puli).
+    return compute_kmeans_groups(matrix, user_ids, sweep_workers=1)
+
+
+def compute_sharded_groups(
+    users_data: List[dict],
+    matrix: np.ndarray,
+    user_ids: List[int],
+    workers: int = GEO_SHARD_WORKERS,
+) -> List[List[int]]:
+    """
+    Grupowanie osobno w każdym regionie, regiony równolegle w procesach.
+    Grupy wracają w stałej kolejności regionów, więc numeracja groupId przy eksporcie
+    (kolejne liczby po całej liście) jest unikalna globalnie i powtarzalna.
+    """
+    lats = np.array([float(rec.get("latitude") or 0.0) for rec in users_data])
+    lons = np.array([float(rec.get("longitude") or 0.0) for rec in users_data])
+    shards = partition_users(lats, lons)
+    if not shards:
+        return []
+
+    sizes = [len(s) for s in shards]
+    print(f"[SHARDS] {len(shards)} regionów (~{GEO_SHARD_CELL_KM:g} km), największy: {max(sizes)} userów")
+
+    if len(shards) == 1:
+        # Jeden region – zwykła ścieżka z równoległym przeglądem k.
+        return compute_kmeans_groups(matrix, user_ids)
+
+    jobs = [(matrix[idx], [user_ids[i] for i in idx]) for idx in shards]
+    if workers <= 1:
+        results = [compute_kmeans_groups(m, ids) for m, ids in jobs]
+    else:
+        # Największe regiony najpierw, żeby na końcu nie czekać na jeden duży.
+        order = sorted(range(len(jobs)), key=lambda i: -sizes[i])
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(jobs)),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=limit_process_threads,
+            initargs=(1,),
+        ) as executor:
+            futures = {i: executor.submit(_cluster_shard, *jobs[i]) for i in order}
+            results = [futures[i].result() for i in range(len(jobs))]
+
+    for i, groups in enumerate(results):
+        print(f"[SHARDS] Region {i + 1}/{len(results)}: {sizes[i]} userów -> {len(groups)} grup")
+    return [group for groups in results for group in groups]
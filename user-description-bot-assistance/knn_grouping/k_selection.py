@@ -0,0 +1,312 @@
+# knn_grouping/k_selection.py
+import heapq
+import math
+from functools import partial
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+
+import numpy as np
+
+from .config import (
+    K_SEARCH_STEPS,
+    K_SELECTION_MODE,
+    K_SWEEP_MIN_USERS,
+    K_SWEEP_THREADS,
+    K_SWEEP_WORKERS,
+    K_WARM_CHAIN,
+    K_WARM_START,
+    MINIBATCH_MIN_USERS,
+    SILHOUETTE_METHOD,
+    SILHOUETTE_SAMPLE_SIZE,
+)
+from .parallel_sweep import SweepPool
+
+RANDOM_STATE = 42
+
+
+class KFit(NamedTuple):
+    k: int
+    score: float
+    labels: np.ndarray
+    inertia: float
+    centers: np.ndarray
+
+
+def fit_kmeans(matrix: np.ndarray, k: int, exact: bool = False, init: Optional[np.ndarray] = None):
+    # sklearn ładowany dopiero tutaj – sam import trwa ~1 s.
+    from sklearn.cluster import KMeans, MiniBatchKMeans
+
+    # Z gotowymi centroidami (warm start) jedna inicjalizacja wystarcza.
+    warm = init is not None
+    if not warm:
+        init = "k-means++"
+
+    if exact or matrix.shape[0] < MINIBATCH_MIN_USERS:
+        model = KMeans(n_clusters=k, init=init, n_init=1 if warm else 10, random_state=RANDOM_STATE)
+    else:
+        # Paczka musi być wyraźnie większa od k, inaczej część centroidów nie dostaje punktów.
+        model = MiniBatchKMeans(
+            n_clusters=k,
+            init=init,
+            n_init=1 if warm else 3,
+            batch_size=max(1024, 3 * k),
+            random_state=RANDOM_STATE,
+        )
+    labels = model.fit_predict(matrix)
+    return labels, model.cluster_centers_, float(model.inertia_)
+
+
+def split_highest_sse(matrix: np.ndarray, labels: np.ndarray, centers: np.ndarray, target_k: int) -> np.ndarray:
+    """
+    Centroidy startowe dla target_k klastrów z wyniku dla mniejszego k:
+    klaster o największym SSE dzielimy na dwa wzdłuż jego głównej osi (SVD),
+    aż centroidów będzie target_k.
+    """
+    k = len(centers)
+    order = np.argsort(labels, kind="stable")
+    bounds = np.searchsorted(labels[order], np.arange(k + 1))
+    members = [order[bounds[c]:bounds[c + 1]] for c in range(k)]
+
+    sq_dist = np.einsum("ij,ij->i", matrix - centers[labels], matrix - centers[labels])
+    sse = np.bincount(labels, weights=sq_dist, minlength=k)
+
+    centers = [c for c in centers]
+    # Przy równym SSE najpierw większy klaster; indeks rozstrzyga resztę deterministycznie.
+    heap = [(-sse[c], -len(members[c]), c) for c in range(k)]
+    heapq.heapify(heap)
+
+    while len(centers) < target_k:
+        _, _, c = heapq.heappop(heap)
+        idx = members[c]
+        pts = matrix[idx]
+        centered = pts - pts.mean(axis=0)
+
+        proj = centered @ np.linalg.svd(centered, full_matrices=False)[2][0]
+        left = proj <= 0
+        if left.all() or not left.any():
+            # Same identyczne punkty – dzielimy po połowie, KMeans i tak to poprawi.
+            left = np.arange(len(idx)) < len(idx) // 2
+
+        for part, slot in ((idx[left], c), (idx[~left], len(centers))):
+            center = matrix[part].mean(axis=0)
+            if slot == len(centers):
+                centers.append(center)
+                members.append(part)
+            else:
+                centers[slot] = center
+                members[slot] = part
+            diff = matrix[part] - center
+            heapq.heappush(heap, (-float(np.einsum("ij,ij->", diff, diff)), -len(part), slot))
+
+    return np.vstack(centers)
+
+
+def sampled_silhouette(
+    matrix: np.ndarray,
+    labels: np.ndarray,
+    sample_size: int = SILHOUETTE_SAMPLE_SIZE,
+) -> float:
+    """
+    Silhouette policzony dla losowej próbki userów, ale względem WSZYSTKICH punktów.
+    (silhouette_score(sample_size=...) z sklearn liczy odległości tylko wewnątrz próbki,
+    co przy klastrach 3–8 osób prawie zawsze zostawia punkt bez sąsiadów z klastra.)
+    Koszt O(sample_size · n) zamiast O(n²).
+    """
+    n = matrix.shape[0]
+    _, labels = np.unique(labels, return_inverse=True)
+    k = int(labels.max()) + 1
+    sizes = np.bincount(labels, minlength=k)
+
+    rng = np.random.default_rng(RANDOM_STATE)
+    sample = np.sort(rng.choice(n, size=min(sample_size, n), replace=False))
+
+    sq_norms = np.einsum("ij,ij->i", matrix, matrix)
+    # Wiersze odległości liczone porcjami, żeby blok (chunk x n) nie przekraczał ~4M liczb.
+    chunk = max(1, 4_000_000 // max(n, k))
+    scores = np.zeros(len(sample))
+
+    for start in range(0, len(sample), chunk):
+        rows = sample[start:start + chunk]
+        c = len(rows)
+        d2 = sq_norms[rows, None] + sq_norms[None, :] - 2.0 * (matrix[rows] @ matrix.T)
+        np.maximum(d2, 0.0, out=d2)
+        dist = np.sqrt(d2)
+        dist[np.arange(c), rows] = 0.0
+
+        # Suma odległości do każdego klastra dla każdego wiersza, jednym bincountem.
+        keys = (np.arange(c)[:, None] * k + labels[None, :]).ravel()
+        sums = np.bincount(keys, weights=dist.ravel(), minlength=c * k).reshape(c, k)
+
+        own = labels[rows]
+        own_sizes = sizes[own]
+        a = sums[np.arange(c), own] / np.maximum(own_sizes - 1, 1)
+        means = sums / np.maximum(sizes, 1)[None, :]
+        means[np.arange(c), own] = np.inf
+        b = means.min(axis=1)
+
+        denom = np.maximum(a, b)
+        s = np.where(denom > 0, (b - a) / np.where(denom > 0, denom, 1.0), 0.0)
+        # Jak w sklearn: punkt sam w klastrze ma silhouette 0.
+        s[own_sizes <= 1] = 0.0
+        scores[start:start + c] = s
+
+    return float(scores.mean())
+
+
+def simplified_silhouette(matrix: np.ndarray, labels: np.ndarray, centers: np.ndarray) -> float:
+    """
+    Uproszczony silhouette: a = odległość do własnego centroidu,
+    b = odległość do najbliższego innego centroidu. Koszt ~O(n log k).
+    """
+    from sklearn.neighbors import NearestNeighbors
+
+    nn = NearestNeighbors(n_neighbors=2).fit(centers)
+    dist, ind = nn.kneighbors(matrix)
+
+    a = np.linalg.norm(matrix - centers[labels], axis=1)
+    b = np.where(ind[:, 0] == labels, dist[:, 1], dist[:, 0])
+
+    denom = np.maximum(a, b)
+    s = np.where(denom > 0, (b - a) / np.where(denom > 0, denom, 1.0), 0.0)
+    return float(s.mean())
+
+
+def score_labels(
+    matrix: np.ndarray,
+    labels: np.ndarray,
+    centers: np.ndarray,
+    exact: bool = False,
+) -> float:
+    from sklearn.metrics import silhouette_score
+
+    if exact or matrix.shape[0] <= SILHOUETTE_SAMPLE_SIZE:
+        return float(silhouette_score(matrix, labels))
+    if SILHOUETTE_METHOD == "simplified":
+        return simplified_silhouette(matrix, labels, centers)
+    return sampled_silhouette(matrix, labels)
+
+
+def _evaluate(matrix: np.ndarray, k: int, exact: bool, init: Optional[np.ndarray] = None):
+    print(f"[KMEANS] Próbuję k={k}" + (" (warm start)..." if init is not None else "..."))
+    labels, centers, inertia = fit_kmeans(matrix, k, exact=exact, init=init)
+    if len(np.unique(labels)) < 2:
+        print(f"[KMEANS] k={k} dał 1 klaster – pomijam w ocenie.")
+        return None, labels, centers
+    score = score_labels(matrix, labels, centers, exact=exact)
+    print(f"[KMEANS] k={k}, silhouette_score={score:.4f}")
+    return KFit(k, score, labels, inertia, centers), labels, centers
+
+
+def evaluate_k(matrix: np.ndarray, k: int, exact: bool = False) -> Optional[KFit]:
+    return _evaluate(matrix, k, exact)[0]
+
+
+def evaluate_chain(matrix: np.ndarray, ks: List[int], exact: bool = False) -> List[Optional[KFit]]:
+    """Kolejne k po sobie: pierwsze od zera, każde następne startuje z centroidów poprzedniego."""
+    fits: List[Optional[KFit]] = []
+    prev = None
+    for k in ks:
+        init = split_highest_sse(matrix, prev[0], prev[1], k) if prev is not None else None
+        fit, labels, centers = _evaluate(matrix, k, exact, init)
+        fits.append(fit)
+        prev = (labels, centers)
+    return fits
+
+
+def _chains(ks: List[int], length: int = K_WARM_CHAIN) -> List[List[int]]:
+    # Podział zależy tylko od ks (nie od liczby procesów), więc wynik równoległy = szeregowy.
+    chains: List[List[int]] = []
+    for k in ks:
+        if chains and k == chains[-1][-1] + 1 and len(chains[-1]) < length:
+            chains[-1].append(k)
+        else:
+            chains.append([k])
+    return chains
+
+
+def evaluate_ks(pool: SweepPool, ks: Iterable[int], exact: bool = False) -> List[Optional[KFit]]:
+    ks = list(ks)
+    # Tryb exact ma dawać dokładnie dawny przegląd – każde k od zera, bez warm startu.
+    if exact or not K_WARM_START:
+        return pool.map(partial(evaluate_k, exact=exact), ks)
+    chains = pool.map(partial(evaluate_chain, exact=exact), _chains(ks))
+    return [fit for chain in chains for fit in chain]
+
+
+def _best(results: Iterable[Optional[KFit]]) -> Optional[KFit]:
+    best = None
+    for result in results:
+        # Przy remisie wygrywa mniejsze k – tak samo jak w pełnym przeglądzie.
+        if result is not None and (
+            best is None or result.score > best.score or (result.score == best.score and result.k < best.k)
+        ):
+            best = result
+    return best
+
+
+def coarse_to_fine_ks(
+    min_k: int,
+    max_k: int,
+    evaluate: Callable[[List[int]], Dict[int, Optional[KFit]]],
+    steps: int = K_SEARCH_STEPS,
+) -> Optional[KFit]:
+    """
+    Zamiast sprawdzać każde k: `steps` równo rozłożonych wartości w [lo, hi],
+    potem zawężenie przedziału do sąsiedztwa najlepszego k i powtórka,
+    aż przedział będzie na tyle mały, żeby sprawdzić go w całości.
+    Liczba dopasowań ~ steps · log(max_k - min_k) zamiast (max_k - min_k).
+    """
+    steps = max(4, steps)
+    results: Dict[int, Optional[KFit]] = {}
+
+    def run(ks: List[int]):
+        todo = [k for k in ks if k not in results]
+        if todo:
+            results.update(evaluate(todo))
+
+    lo, hi = min_k, max_k
+    while hi - lo + 1 > steps:
+        ks = sorted({int(round(k)) for k in np.linspace(lo, hi, steps)})
+        run(ks)
+        best = _best(results[k] for k in range(lo, hi + 1) if k in results)
+        if best is None:
+            # Żadne z próbnych k nie dało 2+ klastrów – pełny przegląd nic tu nie zmieni.
+            return _best(results.values())
+        step = int(math.ceil((hi - lo) / (steps - 1)))
+        new_lo, new_hi = max(lo, best.k - step), min(hi, best.k + step)
+        if (new_lo, new_hi) == (lo, hi):
+            break
+        lo, hi = new_lo, new_hi
+
+    run(list(range(lo, hi + 1)))
+    return _best(results.values())
+
+
+def select_k(
+    matrix: np.ndarray,
+    min_k: int,
+    max_k: int,
+    mode: str = K_SELECTION_MODE,
+    workers: int = K_SWEEP_WORKERS,
+    cache: Optional[Dict[int, KFit]] = None,
+) -> Optional[KFit]:
+    """
+    Najlepsze k z [min_k, max_k]. Jeśli podano `cache`, trafia do niego KFit
+    (etykiety, inercja, centroidy) każdego sprawdzonego k – do użycia w dalszych etapach.
+    """
+    if matrix.shape[0] < K_SWEEP_MIN_USERS:
+        workers = 1
+
+    with SweepPool(matrix, workers=workers, threads_per_worker=K_SWEEP_THREADS) as pool:
+
+        def evaluate(ks: List[int], exact: bool = False) -> Dict[int, Optional[KFit]]:
+            fits = dict(zip(ks, evaluate_ks(pool, ks, exact=exact)))
+            if cache is not None:
+                cache.update((k, fit) for k, fit in fits.items() if fit is not None)
+            return fits
+
+        if mode == "exact":
+            print(f"[KMEANS] Tryb exact: pełny przegląd k w [{min_k}, {max_k}]")
+            return _best(evaluate(list(range(min_k, max_k + 1)), exact=True).values())
+
+        print(f"[KMEANS] Tryb fast: przeszukiwanie zgrubne -> dokładne k w [{min_k}, {max_k}]")
+        return coarse_to_fine_ks(min_k, max_k, evaluate)
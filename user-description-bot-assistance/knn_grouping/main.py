@@ -2,9 +2,10 @@
 import time
 
 from .backend import fetch_features_from_backend
-from .config import GEO_WEIGHT, OUTPUT_GROUPS_FILE, WS_URI
+from .config import GEO_SHARDING, GEO_WEIGHT, OUTPUT_GROUPS_FILE, WS_URI
 from .features import build_trait_index, build_feature_matrix
 from .clustering import compute_kmeans_groups
+from .geo_shards import compute_sharded_groups
 from .groups_export import build_group_export_for_ws, save_groups_to_file
 from .ws_client import GroupsWebSocketClient
 
@@ -23,7 +24,10 @@ def main():
 
     trait_index = build_trait_index(data)
     matrix, user_ids = build_feature_matrix(data, trait_index, geo_weight=GEO_WEIGHT)
-    groups = compute_kmeans_groups(matrix, user_ids)
+    if GEO_SHARDING:
+        groups = compute_sharded_groups(data, matrix, user_ids)
+    else:
+        groups = compute_kmeans_groups(matrix, user_ids)
 
     ws_group_records = build_group_export_for_ws(groups, data)
     save_groups_to_file(ws_group_records, filename=OUTPUT_GROUPS_FILE)
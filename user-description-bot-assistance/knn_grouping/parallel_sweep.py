@@ -0,0 +1,101 @@
+# knn_grouping/parallel_sweep.py
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Iterable, List, Optional
+
+import numpy as np
+
+from .config import K_SWEEP_WORKERS
+
+# Macierz cech w procesie roboczym (widok na pamięć współdzieloną, tylko do odczytu).
+_worker_matrix: Optional[np.ndarray] = None
+_worker_shm = None
+
+_THREAD_ENV_VARS = ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS")
+
+
+def limit_threads(threads: int):
+    # BLAS (matmul w silhouette) i OpenMP (KMeans w sklearn) – bez tego każdy proces
+    # odpala tyle wątków, ile jest rdzeni, i N procesów dusi się nawzajem.
+    # threadpool_limits obejmuje tylko biblioteki już załadowane, a runtime OpenMP
+    # ładuje się dopiero z sklearn – stąd import przed ustawieniem limitu.
+    import sklearn.cluster  # noqa: F401
+    from threadpoolctl import threadpool_limits
+
+    return threadpool_limits(limits=threads)
+
+
+def limit_process_threads(threads: int):
+    """
+    Initializer procesów puli: zmienne środowiskowe ustawione przed importem sklearn,
+    więc OpenMP/BLAS startują już z limitem, a limit_threads dociska to, co załadowane.
+    """
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    limit_threads(threads)
+
+
+def _init_worker(shm_name: str, shape, dtype: str, threads: int):
+    global _worker_matrix, _worker_shm
+    limit_process_threads(threads)
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_matrix = np.ndarray(shape, dtype=np.dtype(dtype), buffer=_worker_shm.buf)
+    _worker_matrix.flags.writeable = False
+
+
+def _run(fn: Callable[[np.ndarray, int], Any], k: int):
+    return fn(_worker_matrix, k)
+
+
+class SweepPool:
+    """
+    Pula procesów do przeglądu wielu k na tej samej macierzy.
+
+    Macierz trafia raz do pamięci współdzielonej – zadanie to tylko (funkcja, k),
+    bez kopiowania macierzy do każdego procesu. Każde k liczone jest przy tym samym
+    limicie wątków BLAS/OpenMP (także w trybie szeregowym, workers <= 1), a wyniki
+    wracają w kolejności ks, więc przy stałym random_state wynik jest identyczny
+    jak przy przeglądzie szeregowym.
+
+    fn musi być funkcją z poziomu modułu (lub functools.partial takiej funkcji),
+    bo procesy uruchamiane są metodą "spawn".
+    """
+
+    def __init__(self, matrix: np.ndarray, workers: Optional[int] = None, threads_per_worker: int = 1):
+        self.matrix = np.ascontiguousarray(matrix)
+        self.workers = max(1, workers if workers is not None else K_SWEEP_WORKERS)
+        self.threads_per_worker = max(1, threads_per_worker)
+        self._shm = None
+        self._executor = None
+
+    def __enter__(self) -> "SweepPool":
+        if self.workers > 1:
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, self.matrix.nbytes))
+            shared = np.ndarray(self.matrix.shape, dtype=self.matrix.dtype, buffer=self._shm.buf)
+            shared[...] = self.matrix
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(self._shm.name, self.matrix.shape, self.matrix.dtype.str, self.threads_per_worker),
+            )
+            print(f"[SWEEP] Pula {self.workers} procesów x {self.threads_per_worker} wątek(ów) BLAS")
+        return self
+
+    def __exit__(self, *exc):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def map(self, fn: Callable[[np.ndarray, int], Any], ks: Iterable[int]) -> List[Any]:
+        ks = list(ks)
+        if self._executor is None or len(ks) <= 1:
+            with limit_threads(self.threads_per_worker):
+                return [fn(self.matrix, k) for k in ks]
+        return list(self._executor.map(_run, [fn] * len(ks), ks))
@@ -6,6 +6,8 @@ from typing import List
 
 import websocket  # type: ignore
 
+from stomp_codec import StompDecoder, StompError
+
 
 def stomp_frame(command, headers=None, body: str = "") -> str:
     if headers is None:
@@ -29,6 +31,7 @@ class GroupsWebSocketClient:
         self.uri = uri
         self.ws = None
         self.connected = False
+        self.decoder = StompDecoder()
 
     def connect(self):
         def _run():
@@ -48,6 +51,7 @@ class GroupsWebSocketClient:
     def on_open(self, ws):
         print("✅ [WS-GROUPS] Połączono z serwerem.")
         self.connected = True
+        self.decoder.reset()
 
         connect_frame = stomp_frame(
             "CONNECT",
@@ -70,14 +74,16 @@ class GroupsWebSocketClient:
         print("🎧 [WS-GROUPS] Zasubskrybowano /topic/groups")
 
     def on_message(self, ws, message):
-        if message == "\n":
+        try:
+            frames = self.decoder.feed(message)
+        except StompError as e:
+            print(f"⚠️ [WS-GROUPS] Niepoprawna ramka STOMP: {e}")
             return
 
-        if "\n\n" in message:
-            header, body = message.split("\n\n", 1)
-            clean_body = body.replace("\x00", "").strip()
+        for frame in frames:
+            clean_body = frame.text.strip()
             if clean_body:
-                print(f"📩 [WS-GROUPS ODBIÓR]: {clean_body[:200]}...")
+                print(f"📩 [WS-GROUPS ODBIÓR] {frame.command}: {clean_body[:200]}...")
 
     def on_error(self, ws, error):
         print(f"❌ [WS-GROUPS] Błąd: {error}")
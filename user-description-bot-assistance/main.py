@@ -15,6 +15,8 @@ import requests   # HTTP do backendu Javy
 import re
 import numpy as np
 
+from stomp_codec import StompDecoder, StompError
+
 # ================== KONFIG OPENAI / .ENV ==================
 load_dotenv()
 
@@ -78,6 +80,7 @@ class WebSocketClient:
         self.ws = None
         self.connected = False
         self.running = True
+        self.decoder = StompDecoder()
         self.thread = threading.Thread(target=self._run_loop)
         self.thread.daemon = True
 
@@ -107,6 +110,7 @@ class WebSocketClient:
     def on_open(self, ws):
         print("✅ [WS] Połączono z serwerem.")
         self.connected = True
+        self.decoder.reset()
 
         connect_frame = stomp_frame(
             "CONNECT",
@@ -129,16 +133,19 @@ class WebSocketClient:
         print("🎧 [WS] Zasubskrybowano /topic/description")
 
     def on_message(self, ws, message):
-        if message == "\n":
-            return
-
-        if "\n\n" not in message:
-            print(f"📩 [WS RAW]: {message!r}")
+        try:
+            frames = self.decoder.feed(message)
+        except StompError as e:
+            print(f"⚠️ [WS] Niepoprawna ramka STOMP: {e}")
             return
 
-        header, body = message.split("\n\n", 1)
-        clean_body = body.replace("\x00", "").strip()
+        for frame in frames:
+            if frame.command != "MESSAGE":
+                print(f"📩 [WS {frame.command}]: {frame.headers}")
+                continue
+            self.handle_message_body(frame.text.strip())
 
+    def handle_message_body(self, clean_body: str):
         if not clean_body:
             return
 
@@ -0,0 +1,178 @@
+"""
+Incremental STOMP 1.1/1.2 frame decoder.
+
+Websocket messages do not have to line up with STOMP frames: one message can
+carry several frames, a large frame can arrive in pieces, and bare EOLs are
+heart-beats. StompDecoder.feed() takes whatever arrived (str, bytes,
+bytearray or memoryview) and returns the frames completed so far.
+
+user-description-bot-assistance/stomp_codec.py is a byte-identical copy for
+the services started from that directory; vendor_sync.py checks and updates it.
+"""
+
+_HEADER_ESCAPES = {b"n": b"\n", b"r": b"\r", b"c": b":", b"\\": b"\\"}
+
+# CONNECT/CONNECTED headers are not escaped (STOMP 1.2 spec).
+_RAW_HEADER_COMMANDS = {"CONNECT", "CONNECTED"}
+
+
+class StompError(ValueError):
+    pass
+
+
+class StompFrame:
+    __slots__ = ("command", "headers", "body")
+
+    def __init__(self, command, headers, body):
+        self.command = command
+        self.headers = headers
+        self.body = body
+
+    @property
+    def text(self):
+        charset = "utf-8"
+        content_type = self.headers.get("content-type", "")
+        if "charset=" in content_type:
+            charset = content_type.split("charset=", 1)[1].split(";", 1)[0].strip() or charset
+        return self.body.decode(charset, errors="replace")
+
+    def __repr__(self):
+        return f"StompFrame({self.command!r}, {self.headers!r}, <{len(self.body)} bytes>)"
+
+
+def _unescape(value):
+    if b"\\" not in value:
+        return value
+    out = bytearray()
+    i = 0
+    while i < len(value):
+        ch = value[i:i + 1]
+        if ch == b"\\":
+            escaped = _HEADER_ESCAPES.get(value[i + 1:i + 2])
+            if escaped is None:
+                raise StompError(f"Invalid header escape in {bytes(value)!r}")
+            out += escaped
+            i += 2
+        else:
+            out += ch
+            i += 1
+    return bytes(out)
+
+
+def _parse_head(head):
+    lines = head.split(b"\n")
+    command = lines[0].rstrip(b"\r").decode("utf-8")
+    escaped = command not in _RAW_HEADER_COMMANDS
+
+    headers = {}
+    for line in lines[1:]:
+        line = line.rstrip(b"\r")
+        if not line:
+            continue
+        key, sep, value = line.partition(b":")
+        if not sep:
+            raise StompError(f"Malformed header line {bytes(line)!r}")
+        if escaped:
+            key, value = _unescape(key), _unescape(value)
+        key = key.decode("utf-8")
+        # Repeated headers: the first one wins.
+        if key not in headers:
+            headers[key] = value.decode("utf-8")
+    return command, headers
+
+
+class StompDecoder:
+    """
+    Buffers incoming data and splits it into StompFrames.
+
+    Headers of a frame are parsed once, as soon as they are complete; the body
+    is then located via content-length (or the terminating NUL when absent)
+    and copied out of the buffer exactly once. Without content-length the
+    NUL search resumes where the previous feed() stopped, so a body arriving
+    in many fragments is scanned once, not once per fragment.
+    """
+
+    def __init__(self, max_frame_size=16 * 1024 * 1024):
+        self.max_frame_size = max_frame_size
+        self.heartbeats = 0
+        self._buf = bytearray()
+        # (command, headers, body_start, content_length, nul_scan_from) of a frame awaiting its body
+        self._pending = None
+
+    def reset(self):
+        self._buf.clear()
+        self._pending = None
+
+    def feed(self, data):
+        if isinstance(data, str):
+            data = data.encode("utf-8")
+        self._buf += data
+
+        frames = []
+        try:
+            pos = self._parse(frames)
+        except StompError:
+            self.reset()
+            raise
+        if pos:
+            del self._buf[:pos]
+            if self._pending:
+                command, headers, body_start, length, scan_from = self._pending
+                self._pending = (command, headers, body_start - pos, length, scan_from - pos)
+
+        if len(self._buf) > self.max_frame_size:
+            size = len(self._buf)
+            self.reset()
+            raise StompError(f"STOMP frame larger than {self.max_frame_size} bytes ({size} buffered)")
+        return frames
+
+    def _parse(self, frames):
+        buf = self._buf
+        view = memoryview(buf)
+        pos = 0
+        try:
+            while True:
+                if self._pending is None:
+                    # Heart-beats (bare EOLs) between frames.
+                    while pos < len(buf) and buf[pos] in (0x0A, 0x0D):
+                        if buf[pos] == 0x0A:
+                            self.heartbeats += 1
+                        pos += 1
+                    if pos >= len(buf):
+                        return pos
+
+                    head_end = buf.find(b"\n\n", pos)
+                    crlf_end = buf.find(b"\r\n\r\n", pos)
+                    if crlf_end != -1 and (head_end == -1 or crlf_end < head_end):
+                        head_end, sep_len = crlf_end, 4
+                    elif head_end != -1:
+                        sep_len = 2
+                    else:
+                        return pos
+
+                    command, headers = _parse_head(bytes(view[pos:head_end]))
+                    length = headers.get("content-length")
+                    try:
+                        length = int(length) if length is not None else None
+                    except ValueError:
+                        raise StompError(f"Invalid content-length {length!r}")
+                    self._pending = (command, headers, head_end + sep_len, length, head_end + sep_len)
+
+                command, headers, body_start, length, scan_from = self._pending
+                if length is not None:
+                    body_end = body_start + length
+                    if len(buf) <= body_end:
+                        return pos
+                    if buf[body_end] != 0:
+                        raise StompError(f"{command} frame is not NUL-terminated after content-length {length}")
+                else:
+                    body_end = buf.find(b"\0", scan_from)
+                    if body_end == -1:
+                        self._pending = (command, headers, body_start, length, len(buf))
+                        return pos
+
+                frames.append(StompFrame(command, headers, bytes(view[body_start:body_end])))
+                self._pending = None
+                pos = body_end + 1
+        finally:
+            view.release()
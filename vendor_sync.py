@@ -0,0 +1,51 @@
+"""
+Vendored module check.
+
+The services in user-description-bot-assistance run from that directory and
+cannot import the worker's modules, so the ones they share are kept there as
+byte-identical copies. The check fails when a copy drifted from its original.
+
+  python vendor_sync.py
+  python vendor_sync.py --fix
+"""
+
+import argparse
+import filecmp
+import os
+import shutil
+import sys
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SUBPROJECT = os.path.join(ROOT, "user-description-bot-assistance")
+
+# original (relative to ROOT) -> copy
+VENDORED = {
+    "stomp_codec.py": os.path.join(SUBPROJECT, "stomp_codec.py"),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--fix", action="store_true", help="overwrite drifted copies with the original")
+    args = parser.parse_args()
+
+    drifted = 0
+    for name, copy in VENDORED.items():
+        original = os.path.join(ROOT, name)
+        if os.path.exists(copy) and filecmp.cmp(original, copy, shallow=False):
+            print(f"ok       {name}")
+            continue
+        if args.fix:
+            shutil.copyfile(original, copy)
+            print(f"updated  {os.path.relpath(copy, ROOT)}")
+        else:
+            print(f"DRIFTED  {os.path.relpath(copy, ROOT)} differs from {name}")
+            drifted += 1
+
+    if drifted:
+        print("Run `python vendor_sync.py --fix` after changing the original.")
+    return 1 if drifted else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,198 @@
+import asyncio
+import contextvars
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
+from deadline import current_deadline
+from metrics import metrics
+from rate_limiter import limiter
+
+# >1 collects venue suggestions from concurrent lookups into one chat completion.
+VENUE_BATCH_SIZE = int(os.getenv("VENUE_BATCH_SIZE", "1"))
+VENUE_BATCH_WINDOW = float(os.getenv("VENUE_BATCH_WINDOW", "0.2"))
+VENUE_BATCH_THREADS = int(os.getenv("VENUE_BATCH_THREADS", "4"))
+
+
+class BatchItem:
+    __slots__ = ("address", "category", "rejected", "future")
+
+    def __init__(self, address, category, rejected, future):
+        self.address = address
+        self.category = category
+        self.rejected = tuple(rejected)
+        self.future = future
+
+
+class VenueBatcher:
+    """
+    Collects suggestion requests from concurrent venue lookups for up to
+    `window` seconds (or `max_items`), asks for all of them in a single chat
+    completion and verifies every suggested place on the map concurrently.
+
+    suggest() blocks until its own item is verified and returns
+    (place_name, location or None, description).
+    """
+
+    def __init__(self, manager, geocode_executor, max_items=VENUE_BATCH_SIZE, window=VENUE_BATCH_WINDOW):
+        self.manager = manager
+        self.geocode_executor = geocode_executor
+        self.max_items = max(1, max_items)
+        self.window = window
+
+        self._queue = queue.Queue()
+        self._senders = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._thread is None:
+                self._senders = ThreadPoolExecutor(max_workers=VENUE_BATCH_THREADS, thread_name_prefix="venue-batch")
+                self._thread = threading.Thread(target=self._collect_loop, name="venue-batcher", daemon=True)
+                self._thread.start()
+
+    def suggest(self, address, category, rejected=()):
+        self._ensure_started()
+        future = Future()
+        self._queue.put(BatchItem(address, category, rejected, future))
+        # Waits at most until this group's deadline; the batch itself carries on for the others.
+        return future.result(timeout=current_deadline().remaining())
+
+    def _collect_loop(self):
+        while True:
+            items = [self._queue.get()]
+            flush_at = time.monotonic() + self.window
+            while len(items) < self.max_items:
+                remaining = flush_at - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._senders.submit(self._run_batch, items)
+
+    def _run_batch(self, items):
+        manager = self.manager
+        try:
+            prompt = manager._build_batch_prompt(items)
+            with limiter("openai").slot(), metrics.timer("stage_seconds", stage="llm_batch"):
+                response = manager.client.chat.completions.create(**manager._chat_request(prompt))
+            suggestions = manager._parse_batch(response, items)
+        except Exception as e:
+            for item in items:
+                item.future.set_exception(e)
+            return
+
+        metrics.inc("llm_batches_total")
+        metrics.inc("llm_batch_items_total", len(items))
+        print(f"AI batch: {len(items)} group(s) in one completion")
+
+        for item, suggestion in zip(items, suggestions):
+            if suggestion is None:
+                item.future.set_exception(ValueError("no suggestion for this item in the batch response"))
+                continue
+            name, description = suggestion
+            verify = self.geocode_executor.submit(manager._get_coords_from_name, name)
+            # Each group is released as soon as its own place is verified.
+            verify.add_done_callback(
+                lambda f, item=item, name=name, description=description: item.future.set_result(
+                    (name, None if f.exception() else f.result(), description)
+                )
+            )
+
+
+def _detached_task(coro):
+    # A task copies the creating context, deadline included; shared work must not
+    # run against the deadline of whichever group happened to start it.
+    return contextvars.Context().run(asyncio.create_task, coro)
+
+
+class AsyncVenueBatcher:
+    """
+    VenueBatcher for AsyncVenueManager: same batching, one event loop, no threads.
+    The collector and batch tasks run without any group's deadline; each group
+    only bounds its own wait in suggest().
+    """
+
+    def __init__(self, manager, max_items=VENUE_BATCH_SIZE, window=VENUE_BATCH_WINDOW):
+        self.manager = manager
+        self.max_items = max(1, max_items)
+        self.window = window
+
+        self._queue = None
+        self._collector = None
+        self._batches = set()
+
+    async def suggest(self, address, category, rejected=()):
+        if self._collector is None:
+            self._queue = asyncio.Queue()
+            self._collector = _detached_task(self._collect_loop())
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put(BatchItem(address, category, rejected, future))
+        # shield(): a group that stops waiting must not cancel the shared future.
+        return await asyncio.wait_for(asyncio.shield(future), timeout=current_deadline().remaining())
+
+    async def _collect_loop(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            items = [await self._queue.get()]
+            flush_at = loop.time() + self.window
+            while len(items) < self.max_items:
+                remaining = flush_at - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    items.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+            task = _detached_task(self._run_batch(items))
+            self._batches.add(task)
+            task.add_done_callback(self._batches.discard)
+
+    async def _run_batch(self, items):
+        manager = self.manager
+        try:
+            prompt = manager._build_batch_prompt(items)
+            async with limiter("openai").aslot():
+                with metrics.timer("stage_seconds", stage="llm_batch"):
+                    response = await manager.client.chat.completions.create(**manager._chat_request(prompt))
+            suggestions = manager._parse_batch(response, items)
+        except Exception as e:
+            for item in items:
+                if not item.future.done():
+                    item.future.set_exception(e)
+            return
+
+        metrics.inc("llm_batches_total")
+        metrics.inc("llm_batch_items_total", len(items))
+        print(f"AI batch: {len(items)} group(s) in one completion")
+
+        async def verify(item, suggestion):
+            if item.future.done():
+                return
+            if suggestion is None:
+                result = ValueError("no suggestion for this item in the batch response")
+            else:
+                name, description = suggestion
+                try:
+                    location = await manager._get_coords_from_name(name)
+                except Exception:
+                    location = None
+                result = (name, location, description)
+            if item.future.done():
+                return
+            if isinstance(result, Exception):
+                item.future.set_exception(result)
+            else:
+                item.future.set_result(result)
+
+        await asyncio.gather(*(verify(item, s) for item, s in zip(items, suggestions)), return_exceptions=True)
+
+    async def close(self):
+        if self._collector is not None:
+            self._collector.cancel()
+            await asyncio.gather(self._collector, *self._batches, return_exceptions=True)
@@ -1,48 +1,199 @@
 import time
 import os
+import sys
 import json
+import asyncio
+import contextvars
+import threading
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dotenv import load_dotenv
-from geopy.geocoders import Photon
-from openai import OpenAI
+
+import geohash
+from deadline import DeadlineExceeded, current_deadline
+from hedge import async_hedged, hedged
+from metrics import metrics
+from poi_index import get_poi_index
+from rate_limiter import limiter
+from shard import shard_local
+from geo_cache import NOT_CACHED, ForwardGeocodeCache, ReverseGeocodeCache
+from single_flight import AsyncSingleFlight, SingleFlight
+from ttl_cache import TTLCache
+from venue_batcher import VENUE_BATCH_SIZE, AsyncVenueBatcher, VenueBatcher
 
 load_dotenv()
 
+VENUE_CACHE_PRECISION = int(os.getenv("VENUE_CACHE_PRECISION", "6"))
+VENUE_CACHE_TTL = float(os.getenv("VENUE_CACHE_TTL", str(24 * 3600)))
+VENUE_CACHE_MAX = int(os.getenv("VENUE_CACHE_MAX", "5000"))
+VENUE_CACHE_PATH = shard_local(os.getenv("VENUE_CACHE_PATH"))
+
+# >1 switches find_venue to one completion with N ranked candidates, geocoded concurrently.
+VENUE_CANDIDATES = int(os.getenv("VENUE_CANDIDATES", "1"))
+VENUE_GEOCODE_THREADS = int(os.getenv("VENUE_GEOCODE_THREADS", "8"))
+
+# "llm" (reverse geocode + GPT + forward geocode) or "poi" (local POI_DATASET index first).
+VENUE_BACKEND = os.getenv("VENUE_BACKEND", "llm")
+POI_LLM_FALLBACK = os.getenv("POI_LLM_FALLBACK", "1") == "1"
+POI_LLM_DESCRIPTIONS = os.getenv("POI_LLM_DESCRIPTIONS", "0") == "1"
+
+# Per-call timeouts (seconds), further shortened by the group's deadline.
+GEOCODE_TIMEOUT = float(os.getenv("GEOCODE_TIMEOUT", "5"))
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "20"))
+
+# Shared by all VenueManagers so concurrent verification never spawns ad-hoc threads.
+_geocode_executor = ThreadPoolExecutor(max_workers=VENUE_GEOCODE_THREADS, thread_name_prefix="geocode")
+
+
+def _openai_api_key():
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        print("WARNING: OPENAI_API_KEY not found in .env")
+    return api_key
+
+
+def normalize_category(category):
+    parts = [p.strip().lower() for p in (category or "").split(",")]
+    return ", ".join(sorted(p for p in parts if p)) or "meeting"
+
+
+def _candidate_location(name, future):
+    """Location from a finished candidate lookup; a failure only drops that candidate."""
+    try:
+        return future.result()
+    except Exception as e:
+        print(f"Geocoding candidate {name} failed: {e}")
+        return None
+
+
 class VenueManager:
     def __init__(self):
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            print("WARNING: OPENAI_API_KEY not found in .env")
-        
-        self.client = OpenAI(api_key=api_key)
-        self.geolocator = Photon(user_agent="hackathon_radar_worker_v2")
+        # OpenAI / Photon clients are built on first use, so importing this
+        # module (CLI, bench, the async worker) does not pay for them.
+        self._client = None
+        self._geolocator = None
+        self._lazy_lock = threading.Lock()
+        self.inflight = SingleFlight("venue-lookups")
+        self._init_shared_state()
+
+    @property
+    def client(self):
+        if self._client is None:
+            with self._lazy_lock:
+                if self._client is None:
+                    from openai import OpenAI
+
+                    self._client = OpenAI(api_key=_openai_api_key())
+        return self._client
+
+    @client.setter
+    def client(self, value):
+        self._client = value
+
+    @property
+    def geolocator(self):
+        if self._geolocator is None:
+            with self._lazy_lock:
+                if self._geolocator is None:
+                    from geopy.geocoders import Photon
+
+                    self._geolocator = Photon(user_agent="hackathon_radar_worker_v2")
+        return self._geolocator
+
+    @geolocator.setter
+    def geolocator(self, value):
+        self._geolocator = value
+
+    def _init_shared_state(self):
+        self.candidates = VENUE_CANDIDATES
+        self.poi_index = get_poi_index() if VENUE_BACKEND == "poi" else None
+        self.cache_precision = VENUE_CACHE_PRECISION
+        self.venue_cache = TTLCache(
+            max_entries=VENUE_CACHE_MAX, ttl=VENUE_CACHE_TTL, path=VENUE_CACHE_PATH, name="venue-cache"
+        )
+        self.reverse_cache = ReverseGeocodeCache()
+        self.forward_cache = ForwardGeocodeCache()
+        self.batcher = self._make_batcher() if VENUE_BATCH_SIZE > 1 else None
+        self._register_gauges()
+
+    def _register_gauges(self):
+        metrics.gauge("singleflight_calls", lambda: self.inflight.stats()["calls"], flight=self.inflight.name)
+        metrics.gauge("singleflight_shared", lambda: self.inflight.stats()["shared"], flight=self.inflight.name)
+        caches = {"venue": self.venue_cache, "reverse": self.reverse_cache, "forward": self.forward_cache}
+        for cache_name, cache in caches.items():
+            for field in ("hits", "misses", "evictions"):
+                metrics.gauge(f"cache_{field}", lambda cache=cache, field=field: cache.stats()[field], cache=cache_name)
+
+    def _make_batcher(self):
+        return VenueBatcher(self, _geocode_executor)
+
+    def venue_cache_key(self, lat, lng, category):
+        return f"{geohash.encode(lat, lng, self.cache_precision)}|{normalize_category(category)}"
+
+    def cache_stats(self):
+        return {
+            "venue": self.venue_cache.stats(),
+            "reverse": self.reverse_cache.stats(),
+            "forward": self.forward_cache.stats(),
+            "inflight": self.inflight.stats(),
+        }
+
+    def _photon(self, stage, method, *args, **kwargs):
+        """One rate-limited Photon call, bounded by GEOCODE_TIMEOUT and the group's deadline."""
+        deadline = current_deadline()
+        with limiter("photon").slot(timeout=deadline.remaining()), metrics.timer("stage_seconds", stage=stage):
+            return getattr(self.geolocator, method)(*args, timeout=deadline.timeout(GEOCODE_TIMEOUT), **kwargs)
 
     def _get_address_from_coords(self, lat, lng):
+        cached = self.reverse_cache.lookup(lat, lng)
+        if cached:
+            return cached
         try:
-            location = self.geolocator.reverse(f"{lat}, {lng}")
-            return location.address if location else "Centrum miasta"
+            location = hedged("reverse_geocode", self._photon, "reverse_geocode", "reverse", f"{lat}, {lng}")
+            if not location:
+                return "Centrum miasta"
+            self.reverse_cache.put(lat, lng, location.address)
+            return location.address
         except Exception as e:
             print(f"Geo error (reverse): {e}")
+            metrics.inc("errors_total", stage="reverse_geocode")
             return "Twoja Okolica"
 
+    def prewarm_addresses(self, coords):
+        def resolve(lat, lng):
+            try:
+                location = self._photon("reverse_geocode", "reverse", f"{lat}, {lng}")
+                return location.address if location else None
+            except Exception as e:
+                print(f"Geo error (prewarm): {e}")
+                return None
+
+        resolved = self.reverse_cache.prewarm(coords, resolve)
+        print(f"Prewarmed {resolved} addresses ({self.reverse_cache.stats()})")
+        return resolved
+
     def _get_coords_from_name(self, place_name):
+        cached = self.forward_cache.lookup(place_name)
+        if cached is not NOT_CACHED:
+            return cached
         try:
-            location = self.geolocator.geocode(place_name, limit=1)
+            location = hedged("forward_geocode", self._photon, "forward_geocode", "geocode", place_name, limit=1)
             if location:
-                return {
+                result = {
                     "lat": location.latitude, 
                     "lng": location.longitude, 
                     "address": location.address
                 }
+                self.forward_cache.put(place_name, result)
+                return result
+            self.forward_cache.put_missing(place_name)
             return None
         except Exception as e:
             print(f"Geo error (geocode): {e}")
+            metrics.inc("errors_total", stage="forward_geocode")
             return None
 
-    def find_venue(self, lat, lng, category):
-        address_context = self._get_address_from_coords(lat, lng)
-        print(f"Searching for '{category}' near: {address_context[:40]}...")
-
-        system_prompt = f"""
+    def _build_prompt(self, address_context, category, rejected=()):
+        prompt = f"""
         Jesteś lokalnym przewodnikiem. 
         Użytkownicy są tutaj: "{address_context}".
         Szukają miejsca kategorii: "{category}".
@@ -53,47 +204,497 @@ class VenueManager:
         
         Zwróć JSON: {{ "place_name": "Nazwa Miejsca, Miasto", "description": "Opis..." }}
         """
+        if rejected:
+            prompt += f"""
+        Tych miejsc nie da się znaleźć na mapie, NIE proponuj ich: {"; ".join(rejected)}.
+        """
+        return prompt
+
+    def _build_candidates_prompt(self, address_context, category, count):
+        return f"""
+        Jesteś lokalnym przewodnikiem. 
+        Użytkownicy są tutaj: "{address_context}".
+        Szukają miejsca kategorii: "{category}".
         
+        ZADANIE:
+        1. Podaj {count} RÓŻNE popularne lokale/miejsca w tej okolicy (znane w Google Maps), od najlepiej pasującego.
+        2. Do każdego napisz krótki, zachęcający opis wydarzenia (max 1 zdanie), ale nie powtarzaj nazwy miejsca.
+        
+        Zwróć JSON: {{ "candidates": [ {{ "place_name": "Nazwa Miejsca, Miasto", "description": "Opis..." }} ] }}
+        """
+
+    def _build_batch_prompt(self, items):
+        lines = []
+        for i, item in enumerate(items, 1):
+            line = f'[id={i}] Użytkownicy są tutaj: "{item.address}". Szukają miejsca kategorii: "{item.category}".'
+            if item.rejected:
+                line += f' NIE proponuj (brak na mapie): {"; ".join(item.rejected)}.'
+            lines.append(line)
+        items_text = "\n        ".join(lines)
+        return f"""
+        Jesteś lokalnym przewodnikiem. Masz {len(items)} niezależnych grup użytkowników:
+        {items_text}
+        
+        ZADANIE (osobno dla KAŻDEJ grupy):
+        1. Podaj nazwę JEDNEGO popularnego lokalu/miejsca w okolicy tej grupy (znanego w Google Maps).
+        2. Napisz krótki, zachęcający opis tego wydarzenia (max 1 zdanie), ale nie powtarzaj nazwy miejsca.
+        
+        Zwróć JSON: {{ "venues": [ {{ "id": 1, "place_name": "Nazwa Miejsca, Miasto", "description": "Opis..." }} ] }}
+        """
+
+    def _build_poi_description_prompt(self, poi, category):
+        return f"""
+        Grupa o zainteresowaniach "{category}" spotyka się w miejscu "{poi['name']}" ({poi.get('address') or ''}).
+        Napisz krótki, zachęcający opis tego wydarzenia (max 1 zdanie), ale nie powtarzaj nazwy miejsca.
+        
+        Zwróć JSON: {{ "description": "Opis..." }}
+        """
+
+    def _chat_request(self, system_prompt):
+        return dict(
+            model="gpt-5.1",
+            messages=[{"role": "system", "content": system_prompt}],
+            response_format={ "type": "json_object" },
+            temperature=0.7,
+            timeout=current_deadline().timeout(LLM_TIMEOUT),
+        )
+
+    def _parse_suggestion(self, response, default_desc):
+        data = json.loads(response.choices[0].message.content)
+        return data.get("place_name", "Rynek"), data.get("description", default_desc)
+
+    def _parse_candidates(self, response, default_desc):
+        data = json.loads(response.choices[0].message.content)
+        candidates = []
+        for item in data.get("candidates") or []:
+            name = item.get("place_name") if isinstance(item, dict) else None
+            if name and name not in [c[0] for c in candidates]:
+                candidates.append((name, item.get("description", default_desc)))
+        return candidates[:self.candidates]
+
+    def _parse_batch(self, response, items):
+        """(place_name, description) per item, in item order; None where the model skipped one."""
+        data = json.loads(response.choices[0].message.content)
+        by_id = {}
+        for entry in data.get("venues") or []:
+            if isinstance(entry, dict) and entry.get("place_name"):
+                by_id.setdefault(str(entry.get("id")), entry)
+        suggestions = []
+        for i, item in enumerate(items, 1):
+            entry = by_id.get(str(i))
+            default_desc = f"Spotkanie grupy: {item.category}"
+            suggestions.append((entry["place_name"], entry.get("description", default_desc)) if entry else None)
+        return suggestions
+
+    def _venue(self, name, location, description):
+        return {
+            "name": name,
+            "address": location['address'],
+            "lat": location['lat'],
+            "lng": location['lng'],
+            "description": description
+        }
+
+    def _poi_venue(self, lat, lng, category):
+        poi = self.poi_index.nearest(lat, lng, category)
+        if poi is None:
+            print(f"No local POI for '{category}'.")
+            return None
+        print(f"Local POI: {poi['name']} ({poi['lat']}, {poi['lng']})")
+        location = {"lat": poi["lat"], "lng": poi["lng"], "address": poi.get("address") or poi["name"]}
+        return poi, location
+
+    def _deadline_exceeded(self):
+        if not current_deadline().expired():
+            return False
+        print("Group deadline exceeded.")
+        metrics.inc("deadline_exceeded_total")
+        return True
+
+    def _fallback(self, lat, lng, category, address_context):
+        print("Using fallback location.")
+        metrics.inc("venue_fallbacks_total")
+        return {
+            "name": f"Spotkanie w okolicy ({category})",
+            "address": address_context,
+            "lat": lat,
+            "lng": lng,
+            "description": f"Spotkanie grupy: {category}"
+        }
+
+    def find_venue(self, lat, lng, category):
+        key = self.venue_cache_key(lat, lng, category)
+        cached = self.venue_cache.get(key)
+        if cached is not None:
+            print(f"Venue cache hit: {key}")
+            metrics.inc("venue_cache_total", result="hit")
+            return dict(cached)
+
+        metrics.inc("venue_cache_total", result="miss")
+        # Identical lookups arriving while this one is running share its result.
+        try:
+            return dict(self.inflight.do(key, self._lookup_and_cache, key, lat, lng, category))
+        except DeadlineExceeded:
+            # Our deadline ran out while waiting on someone else's lookup.
+            self._deadline_exceeded()
+            return self._fallback(lat, lng, category, self.reverse_cache.lookup(lat, lng) or "Twoja Okolica")
+
+    def _lookup_and_cache(self, key, lat, lng, category):
+        cached = self.venue_cache.peek(key)
+        if cached is not None:
+            return cached
+
+        venue, verified = self._search_venue(lat, lng, category)
+        # Fallbacks are not cached, so the next group in this cell gets a fresh attempt.
+        if verified:
+            self.venue_cache.put(key, venue)
+        return venue
+
+    def _search_venue(self, lat, lng, category):
+        if self.poi_index is not None:
+            found = self._poi_venue(lat, lng, category)
+            if found:
+                poi, location = found
+                return self._venue(poi["name"], location, self._describe_poi(poi, category)), True
+            if not POI_LLM_FALLBACK:
+                return self._fallback(lat, lng, category, self.reverse_cache.lookup(lat, lng) or "Twoja Okolica"), False
+
+        address_context = self._get_address_from_coords(lat, lng)
+        print(f"Searching for '{category}' near: {address_context[:40]}...")
+
+        if self.candidates > 1:
+            return self._search_venue_candidates(lat, lng, category, address_context)
+
         default_desc = f"Spotkanie grupy: {category}"
+        rejected = []
 
         for attempt in range(3): 
+            if self._deadline_exceeded():
+                break
             try:
-                response = self.client.chat.completions.create(
-                    model="gpt-5.1",
-                    messages=[{"role": "system", "content": system_prompt}],
-                    response_format={ "type": "json_object" },
-                    temperature=0.7
-                )
-                data = json.loads(response.choices[0].message.content)
-                suggested_name = data.get("place_name", "Rynek")
-                description = data.get("description", default_desc)
-                
-                print(f"AI suggests: {suggested_name}")
+                if self.batcher is not None:
+                    # Shares one completion with the other groups looked up right now; verified already.
+                    suggested_name, real_location, description = self.batcher.suggest(address_context, category, rejected)
+                    print(f"AI suggests: {suggested_name}")
+                else:
+                    system_prompt = self._build_prompt(address_context, category, rejected)
+                    with limiter("openai").slot(timeout=current_deadline().remaining()), metrics.timer("stage_seconds", stage="llm"):
+                        response = self.client.chat.completions.create(**self._chat_request(system_prompt))
+                    suggested_name, description = self._parse_suggestion(response, default_desc)
+                    
+                    print(f"AI suggests: {suggested_name}")
 
-                real_location = self._get_coords_from_name(suggested_name)
+                    real_location = self._get_coords_from_name(suggested_name)
                 
                 if real_location:
                     print(f"Verified on map: {real_location['lat']}, {real_location['lng']}")
-                    return {
-                        "name": suggested_name,
-                        "address": real_location['address'],
-                        "lat": real_location['lat'],
-                        "lng": real_location['lng'],
-                        "description": description
-                    }
+                    return self._venue(suggested_name, real_location, description), True
                 else:
                     print(f"Map failed for '{suggested_name}'. Retrying...")
+                    metrics.inc("retries_total", stage="venue")
+                    rejected.append(suggested_name)
                     
             except Exception as e:
                 print(f"AI Loop Error: {e}")
+                metrics.inc("errors_total", stage="llm")
+
+        return self._fallback(lat, lng, category, address_context), False
+
+    def _search_venue_candidates(self, lat, lng, category, address_context):
+        default_desc = f"Spotkanie grupy: {category}"
+        try:
+            system_prompt = self._build_candidates_prompt(address_context, category, self.candidates)
+            with limiter("openai").slot(timeout=current_deadline().remaining()), metrics.timer("stage_seconds", stage="llm"):
+                response = self.client.chat.completions.create(**self._chat_request(system_prompt))
+            candidates = self._parse_candidates(response, default_desc)
+            print(f"AI suggests: {[name for name, _ in candidates]}")
+
+            futures = [
+                _geocode_executor.submit(contextvars.copy_context().run, self._get_coords_from_name, name)
+                for name, _ in candidates
+            ]
+            # Rank order: the best-ranked verified candidate wins. It is known as soon as every
+            # better-ranked lookup has finished; a slow or failing one only drops itself.
+            pending, abandoned = set(futures), set()
+            checked = 0
+            while checked < len(futures):
+                future = futures[checked]
+                if future in pending:
+                    done, pending = wait(pending, timeout=current_deadline().remaining(), return_when=FIRST_COMPLETED)
+                    if not done:
+                        # Deadline: settle for the best-ranked lookup that did finish.
+                        abandoned, pending = pending, set()
+                    continue
+                name, description = candidates[checked]
+                checked += 1
+                real_location = None if future in abandoned else _candidate_location(name, future)
+                if real_location:
+                    print(f"Verified on map: {name} -> {real_location['lat']}, {real_location['lng']}")
+                    for f in pending | abandoned:
+                        f.cancel()
+                    return self._venue(name, real_location, description), True
+            for f in abandoned:
+                f.cancel()
+            print("Map failed for all candidates.")
+
+        except Exception as e:
+            print(f"AI Candidates Error: {e}")
+
+        return self._fallback(lat, lng, category, address_context), False
+
+    def _describe_poi(self, poi, category):
+        default_desc = f"Spotkanie grupy: {category}"
+        if not POI_LLM_DESCRIPTIONS:
+            return default_desc
+        try:
+            with limiter("openai").slot(timeout=current_deadline().remaining()), metrics.timer("stage_seconds", stage="llm"):
+                response = self.client.chat.completions.create(**self._chat_request(self._build_poi_description_prompt(poi, category)))
+            return json.loads(response.choices[0].message.content).get("description", default_desc)
+        except Exception as e:
+            print(f"AI Description Error: {e}")
+            return default_desc
+
+
+class AsyncVenueManager(VenueManager):
+    """
+    Same lookup as VenueManager, but every network call is awaited
+    (AsyncOpenAI + Photon over aiohttp), so one event loop can keep
+    many groups in flight. Use as `async with AsyncVenueManager() as vm`.
+    """
+
+    def __init__(self):
+        from geopy.adapters import AioHTTPAdapter
+        from geopy.geocoders import Photon
+        from openai import AsyncOpenAI
+
+        self.client = AsyncOpenAI(api_key=_openai_api_key())
+        self.geolocator = Photon(user_agent="hackathon_radar_worker_v2", adapter_factory=AioHTTPAdapter)
+        self.inflight = AsyncSingleFlight("venue-lookups")
+        self._init_shared_state()
+
+    async def __aenter__(self):
+        await self.geolocator.__aenter__()
+        return self
+
+    def _make_batcher(self):
+        return AsyncVenueBatcher(self)
+
+    async def __aexit__(self, *exc):
+        if self.batcher is not None:
+            await self.batcher.close()
+        await self.geolocator.__aexit__(*exc)
+        await self.client.close()
+
+    async def _photon(self, stage, method, *args, **kwargs):
+        deadline = current_deadline()
+        async with limiter("photon").aslot(timeout=deadline.remaining()):
+            with metrics.timer("stage_seconds", stage=stage):
+                return await getattr(self.geolocator, method)(*args, timeout=deadline.timeout(GEOCODE_TIMEOUT), **kwargs)
+
+    async def _get_address_from_coords(self, lat, lng):
+        cached = self.reverse_cache.lookup(lat, lng)
+        if cached:
+            return cached
+        try:
+            location = await async_hedged(
+                "reverse_geocode", lambda: self._photon("reverse_geocode", "reverse", f"{lat}, {lng}")
+            )
+            if not location:
+                return "Centrum miasta"
+            self.reverse_cache.put(lat, lng, location.address)
+            return location.address
+        except Exception as e:
+            print(f"Geo error (reverse): {e}")
+            metrics.inc("errors_total", stage="reverse_geocode")
+            return "Twoja Okolica"
+
+    async def _get_coords_from_name(self, place_name):
+        cached = self.forward_cache.lookup(place_name)
+        if cached is not NOT_CACHED:
+            return cached
+        try:
+            location = await async_hedged(
+                "forward_geocode", lambda: self._photon("forward_geocode", "geocode", place_name, limit=1)
+            )
+            if location:
+                result = {
+                    "lat": location.latitude, 
+                    "lng": location.longitude, 
+                    "address": location.address
+                }
+                self.forward_cache.put(place_name, result)
+                return result
+            self.forward_cache.put_missing(place_name)
+            return None
+        except Exception as e:
+            print(f"Geo error (geocode): {e}")
+            metrics.inc("errors_total", stage="forward_geocode")
+            return None
+
+    async def find_venue(self, lat, lng, category):
+        key = self.venue_cache_key(lat, lng, category)
+        cached = self.venue_cache.get(key)
+        if cached is not None:
+            print(f"Venue cache hit: {key}")
+            metrics.inc("venue_cache_total", result="hit")
+            return dict(cached)
+
+        metrics.inc("venue_cache_total", result="miss")
+        try:
+            return dict(await self.inflight.do(key, self._lookup_and_cache, key, lat, lng, category))
+        except DeadlineExceeded:
+            self._deadline_exceeded()
+            return self._fallback(lat, lng, category, self.reverse_cache.lookup(lat, lng) or "Twoja Okolica")
+
+    async def _lookup_and_cache(self, key, lat, lng, category):
+        cached = self.venue_cache.peek(key)
+        if cached is not None:
+            return cached
+
+        venue, verified = await self._search_venue(lat, lng, category)
+        if verified:
+            self.venue_cache.put(key, venue)
+        return venue
+
+    async def _search_venue(self, lat, lng, category):
+        if self.poi_index is not None:
+            found = self._poi_venue(lat, lng, category)
+            if found:
+                poi, location = found
+                return self._venue(poi["name"], location, await self._describe_poi(poi, category)), True
+            if not POI_LLM_FALLBACK:
+                return self._fallback(lat, lng, category, self.reverse_cache.lookup(lat, lng) or "Twoja Okolica"), False
+
+        address_context = await self._get_address_from_coords(lat, lng)
+        print(f"Searching for '{category}' near: {address_context[:40]}...")
+
+        if self.candidates > 1:
+            return await self._search_venue_candidates(lat, lng, category, address_context)
+
+        default_desc = f"Spotkanie grupy: {category}"
+        rejected = []
+
+        for attempt in range(3):
+            if self._deadline_exceeded():
+                break
+            try:
+                if self.batcher is not None:
+                    suggested_name, real_location, description = await self.batcher.suggest(address_context, category, rejected)
+                    print(f"AI suggests: {suggested_name}")
+                else:
+                    system_prompt = self._build_prompt(address_context, category, rejected)
+                    async with limiter("openai").aslot(timeout=current_deadline().remaining()):
+                        with metrics.timer("stage_seconds", stage="llm"):
+                            response = await self.client.chat.completions.create(**self._chat_request(system_prompt))
+                    suggested_name, description = self._parse_suggestion(response, default_desc)
+
+                    print(f"AI suggests: {suggested_name}")
+
+                    real_location = await self._get_coords_from_name(suggested_name)
+
+                if real_location:
+                    print(f"Verified on map: {real_location['lat']}, {real_location['lng']}")
+                    return self._venue(suggested_name, real_location, description), True
+                else:
+                    print(f"Map failed for '{suggested_name}'. Retrying...")
+                    metrics.inc("retries_total", stage="venue")
+                    rejected.append(suggested_name)
+
+            except Exception as e:
+                print(f"AI Loop Error: {e}")
+                metrics.inc("errors_total", stage="llm")
+
+        return self._fallback(lat, lng, category, address_context), False
+
+    async def _search_venue_candidates(self, lat, lng, category, address_context):
+        default_desc = f"Spotkanie grupy: {category}"
+        try:
+            system_prompt = self._build_candidates_prompt(address_context, category, self.candidates)
+            async with limiter("openai").aslot(timeout=current_deadline().remaining()):
+                with metrics.timer("stage_seconds", stage="llm"):
+                    response = await self.client.chat.completions.create(**self._chat_request(system_prompt))
+            candidates = self._parse_candidates(response, default_desc)
+            print(f"AI suggests: {[name for name, _ in candidates]}")
+
+            tasks = [asyncio.create_task(self._get_coords_from_name(name)) for name, _ in candidates]
+            # Same ranking as the threaded version: the best-ranked verified candidate wins
+            # once every better-ranked lookup has finished; losers are cancelled.
+            try:
+                pending, abandoned = set(tasks), set()
+                checked = 0
+                while checked < len(tasks):
+                    task = tasks[checked]
+                    if task in pending:
+                        done, pending = await asyncio.wait(
+                            pending, timeout=current_deadline().remaining(), return_when=asyncio.FIRST_COMPLETED
+                        )
+                        if not done:
+                            # Deadline: settle for the best-ranked lookup that did finish.
+                            abandoned, pending = pending, set()
+                        continue
+                    name, description = candidates[checked]
+                    checked += 1
+                    real_location = None if task in abandoned else _candidate_location(name, task)
+                    if real_location:
+                        print(f"Verified on map: {name} -> {real_location['lat']}, {real_location['lng']}")
+                        return self._venue(name, real_location, description), True
+            finally:
+                for task in tasks:
+                    task.cancel()
+            print("Map failed for all candidates.")
+
+        except Exception as e:
+            print(f"AI Candidates Error: {e}")
+
+        return self._fallback(lat, lng, category, address_context), False
+
+    async def _describe_poi(self, poi, category):
+        default_desc = f"Spotkanie grupy: {category}"
+        if not POI_LLM_DESCRIPTIONS:
+            return default_desc
+        try:
+            async with limiter("openai").aslot(timeout=current_deadline().remaining()):
+                with metrics.timer("stage_seconds", stage="llm"):
+                    response = await self.client.chat.completions.create(**self._chat_request(self._build_poi_description_prompt(poi, category)))
+            return json.loads(response.choices[0].message.content).get("description", default_desc)
+        except Exception as e:
+            print(f"AI Description Error: {e}")
+            return default_desc
+
+
+def load_coords(path):
+    """(lat, lng) pairs from a JSON list of [lat, lng] or group records with latitude/longitude."""
+    with open(path, "r", encoding="utf-8") as f:
+        items = json.load(f)
+
+    coords = []
+    for item in items:
+        if isinstance(item, dict):
+            lat, lng = item.get("latitude"), item.get("longitude")
+        else:
+            lat, lng = item[0], item[1]
+        if lat is not None and lng is not None:
+            coords.append((float(lat), float(lng)))
+    return coords
+
+
+_venue_manager = None
+_venue_manager_lock = threading.Lock()
+
+
+def get_venue_manager():
+    """The process-wide VenueManager, created (caches loaded from disk) on first call."""
+    global _venue_manager
+    if _venue_manager is None:
+        with _venue_manager_lock:
+            if _venue_manager is None:
+                _venue_manager = VenueManager()
+    return _venue_manager
 
-        print("Using fallback location.")
-        return {
-            "name": f"Spotkanie w okolicy ({category})",
-            "address": address_context,
-            "lat": lat,
-            "lng": lng,
-            "description": default_desc
-        }
 
-venue_manager = VenueManager()
\ No newline at end of file
+if __name__ == "__main__":
+    # python venue_manager.py prewarm users_knn_groups.json
+    if len(sys.argv) == 3 and sys.argv[1] == "prewarm":
+        get_venue_manager().prewarm_addresses(load_coords(sys.argv[2]))
+    else:
+        print("Usage: python venue_manager.py prewarm <coords.json>")
@@ -1,21 +1,29 @@
 import websocket
 import threading
+import queue
 import time
-import json
 import os
-import requests
 from dotenv import load_dotenv
 
-from venue_manager import venue_manager
+from deadline import deadline_scope
+from group_store import ProcessedGroupStore, group_key
+from java_delivery import JavaDelivery
+from json_stream import iter_json_array
+from metrics import metrics, start_metrics_server, start_summary_logger
+from shard import ShardMembership
+from stomp_codec import StompDecoder, StompError
+from venue_batcher import VENUE_BATCH_SIZE
+from venue_manager import get_venue_manager
+from worker_pool import PRIORITY_BULK, PRIORITY_NAMES, PRIORITY_NORMAL, STAGE_LIMITS, WORKER_POOL_SIZE, BoundedWorkerPool
 
 load_dotenv()
 
 WS_URI = os.getenv("WS_URI")
 JAVA_API_URL = os.getenv("JAVA_API_URL")
 
-if not WS_URI or not JAVA_API_URL:
-    print(" ERROR: Missing WS_URI or JAVA_API_URL in .env")
-    exit(1)
+# Frames at least this large (full regrouping runs) are parsed off the websocket
+# thread and queued at bulk priority, so small incremental batches overtake them.
+WORKER_BULK_FRAME_BYTES = int(os.getenv("WORKER_BULK_FRAME_BYTES", str(256 * 1024)))
 
 def stomp_frame(command, headers=None, body=""):
     if headers is None: headers = {}
@@ -25,18 +33,63 @@ def stomp_frame(command, headers=None, body=""):
     frame += "\n" + body + "\0"
     return frame
 
+def group_category(group):
+    traits = group.get('topTraits', [])
+    return ", ".join(traits) if traits else "meeting"
+
+def group_priority(group, default=PRIORITY_NORMAL):
+    # An explicit "priority" in the message wins: 0-2 or "high" / "normal" / "bulk".
+    priority = group.get('priority')
+    if isinstance(priority, str) and priority.lower() in PRIORITY_NAMES:
+        return PRIORITY_NAMES.index(priority.lower())
+    if isinstance(priority, int) and not isinstance(priority, bool):
+        return min(max(priority, 0), len(PRIORITY_NAMES) - 1)
+    return default
+
+def build_event_payload(group, venue_result):
+    full_description = f"{venue_result['name']} ({venue_result.get('address','')}). {venue_result.get('description', '')}"
+
+    return {
+        "eventId": group.get('groupId'),
+        "userIds": group.get('users', []),
+        "description": full_description,
+        "latitude": venue_result.get('lat', group.get('latitude')),
+        "longitude": venue_result.get('lng', group.get('longitude'))
+    }
+
 class RadarWorker:
     def __init__(self):
         self.uri = WS_URI
         self.ws = None
         self.connected = False
         self.running = True
-        self.processed_group_ids = set()
+        self.decoder = StompDecoder()
+        self.shard = ShardMembership()
+        self.shard.on_takeover = self._take_over_groups
+        self.group_store = ProcessedGroupStore()
+        self.delivery = JavaDelivery(url=JAVA_API_URL)
+
+        # A venue batch only fills up when that many groups can wait on it at once.
+        self.pool = BoundedWorkerPool(
+            size=max(WORKER_POOL_SIZE, VENUE_BATCH_SIZE),
+            stage_limits={**STAGE_LIMITS, "venue": max(STAGE_LIMITS["venue"], VENUE_BATCH_SIZE)},
+            name="worker",
+        )
+        # One large frame parsed in the background at a time; a second one blocks the socket (backpressure).
+        self.bulk_frames = queue.Queue(maxsize=1)
+        self.bulk_thread = threading.Thread(target=self._bulk_intake_loop, name="bulk-intake", daemon=True)
         
         self.thread = threading.Thread(target=self._run_loop)
         self.thread.daemon = True
 
     def start(self):
+        start_metrics_server()
+        start_summary_logger()
+        self.shard.start()
+        metrics.gauge("shards_live", lambda: len(self.shard.live))
+        self.delivery.start()
+        self.pool.start()
+        self.bulk_thread.start()
         self.thread.start()
         print(f" [WORKER] Starting... Connecting to {self.uri}")
 
@@ -62,85 +115,151 @@ class RadarWorker:
     def on_open(self, ws):
         print(" [WS] Connected.")
         self.connected = True
+        self.decoder.reset()
         ws.send(stomp_frame("CONNECT", headers={"accept-version":"1.1,1.2", "host":"localhost"}))
         time.sleep(0.5)
         ws.send(stomp_frame("SUBSCRIBE", headers={"id":"sub-0", "destination":"/topic/groups"}))
 
     def on_message(self, ws, message):
-        if "\n\n" not in message: return
-        body = message.split("\n\n", 1)[1].strip().replace('\x00', '')
-        if not body: return
-        
-        threading.Thread(target=self.process_incoming_data, args=(body,)).start()
+        try:
+            frames = self.decoder.feed(message)
+        except StompError as e:
+            print(f" [WS] Dropping malformed STOMP data: {e}")
+            return
 
-    def process_incoming_data(self, json_body):
+        for frame in frames:
+            if frame.command == "ERROR":
+                print(f" [WS] Broker error: {frame.headers.get('message', '')} {frame.text[:200]}")
+            elif frame.command == "MESSAGE" and frame.body.strip():
+                if len(frame.body) >= WORKER_BULK_FRAME_BYTES:
+                    self.bulk_frames.put(frame.body)
+                else:
+                    self.process_incoming_data(frame.body)
+
+    def _bulk_intake_loop(self):
+        while True:
+            body = self.bulk_frames.get()
+            if body is None:
+                return
+            # Nothing may end this thread: with it gone the next large frame would
+            # block on_message on bulk_frames.put() and wedge the websocket.
+            try:
+                self.process_incoming_data(body, priority=PRIORITY_BULK)
+            except Exception as e:
+                print(f" [LOGIC] Error processing bulk frame: {e}")
+                metrics.inc("errors_total", stage="bulk_intake")
+
+    def process_incoming_data(self, json_body, priority=PRIORITY_NORMAL):
+        # Groups go to the pool as soon as each one is decoded, so a batch of
+        # thousands starts processing right away and is never held as one list.
+        count = 0
         try:
-            data = json.loads(json_body)
-            groups = data if isinstance(data, list) else [data]
+            for group in iter_json_array(json_body):
+                if not isinstance(group, dict):
+                    metrics.inc("groups_total", result="invalid")
+                    continue
+                if not self.shard.owns(group.get('groupId')):
+                    metrics.inc("groups_total", result="other_shard")
+                    self.shard.hold(group)
+                    continue
+                self.enqueue_group(group, group_priority(group, priority))
+                count += 1
+        except ValueError as e:
+            print(f" [LOGIC] Error processing message after {count} group(s): {e}")
 
+    def _take_over_groups(self, groups):
+        # Called on the lease thread; enqueueing may block on backpressure, so it runs aside.
+        def _enqueue():
             for group in groups:
-                g_id = group.get('groupId')
+                metrics.inc("groups_total", result="taken_over")
+                self.enqueue_group(group, group_priority(group, PRIORITY_BULK))
 
-                if g_id in self.processed_group_ids:
-                    continue
+        threading.Thread(target=_enqueue, name="shard-takeover", daemon=True).start()
 
-                print(f"\n [WORKER] Processing Group ID: {g_id}")
+    def enqueue_group(self, group, priority=PRIORITY_NORMAL):
+        # Blocks the intake thread while this priority's queue is full - that is the backpressure.
+        while not self.pool.submit(self.process_group, group, timeout=5, priority=priority):
+            print(f" [WORKER] Queue full ({self.pool.stats()}), waiting...")
 
-                lat = group.get('latitude')
-                lng = group.get('longitude')
-                traits = group.get('topTraits', [])
-                user_ids = group.get('users', [])
+    def process_group(self, group):
+        g_id = group.get('groupId')
+        key = group_key(group)
 
-                if lat is None or lng is None:
-                    print(" Skipping group without location.")
-                    continue
+        if not self.group_store.claim(key):
+            return
 
-                category_str = ", ".join(traits) if traits else "meeting"
-                
-                venue_result = venue_manager.find_venue(lat, lng, category_str)
+        processed = False
+        started = time.perf_counter()
+        try:
+            print(f"\n [WORKER] Processing Group ID: {g_id}")
 
-                full_description = f"{venue_result['name']} ({venue_result.get('address','')}). {venue_result.get('description', '')}"
-                
-                final_lat = venue_result.get('lat', lat)
-                final_lng = venue_result.get('lng', lng)
+            lat = group.get('latitude')
+            lng = group.get('longitude')
 
-                payload = {
-                    "eventId": g_id,
-                    "userIds": user_ids,
-                    "description": full_description,
-                    "latitude": final_lat,
-                    "longitude": final_lng
-                }
+            if lat is None or lng is None:
+                print(" Skipping group without location.")
+                return
 
-                self.send_to_java(payload)
-                
-                self.processed_group_ids.add(g_id)
+            category_str = group_category(group)
+            
+            # Past GROUP_DEADLINE the lookup gives up and returns the default venue.
+            # The clock starts once a venue slot is held, not while queueing for one.
+            with self.pool.stage("venue"), deadline_scope():
+                venue_result = get_venue_manager().find_venue(lat, lng, category_str)
 
-        except Exception as e:
-            print(f" [LOGIC] Error processing message: {e}")
+            payload = build_event_payload(group, venue_result)
 
-    def send_to_java(self, payload):
-        try:
-            print(f" [HTTP] Sending Event {payload['eventId']} to Java...")
-            res = requests.post(JAVA_API_URL, json=payload, timeout=5)
+            self.send_to_java(payload)
             
-            if res.status_code in [200, 201]:
-                print(f" [HTTP] Success! (200 OK)")
-            else:
-                print(f" [HTTP] Java Error: {res.status_code} - {res.text}")
+            processed = True
+
         except Exception as e:
-            print(f" [HTTP] Connection failed: {e}")
+            print(f" [LOGIC] Error processing group {g_id}: {e}")
+            metrics.inc("errors_total", stage="group")
+        finally:
+            metrics.observe("group_seconds", time.perf_counter() - started)
+            metrics.inc("groups_total", result="processed" if processed else "skipped")
+            if processed:
+                self.group_store.mark_done(key)
+            else:
+                self.group_store.release(key)
+
+    def send_to_java(self, payload):
+        # Delivery retries and spools on its own; once queued the group counts as published.
+        print(f" [HTTP] Queueing Event {payload['eventId']} for Java...")
+        self.delivery.send(payload)
 
     def on_error(self, ws, error): print(f" [WS] Error: {error}")
     def on_close(self, ws, *args): 
         print(" [WS] Disconnected.")
         self.connected = False
 
+    def stop(self):
+        self.running = False
+        if self.ws:
+            self.ws.close()
+        try:
+            self.bulk_frames.put_nowait(None)
+        except queue.Full:
+            pass
+        # Queued groups were never claimed, so they stay eligible if they are published again.
+        self.pool.shutdown(wait=True, cancel_pending=True)
+        self.delivery.stop()
+        self.group_store.close()
+        self.shard.stop()
+
+def check_config():
+    if not WS_URI or not JAVA_API_URL:
+        print(" ERROR: Missing WS_URI or JAVA_API_URL in .env")
+        exit(1)
+
 if __name__ == "__main__":
+    check_config()
     worker = RadarWorker()
     worker.start()
     
     try:
         while True: time.sleep(1)
     except KeyboardInterrupt:
-        print("Stopping worker...")
\ No newline at end of file
+        print("Stopping worker...")
+        worker.stop()
\ No newline at end of file
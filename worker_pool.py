@@ -0,0 +1,258 @@
+import os
+import queue
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from metrics import metrics
+
+
+def _env_int(name, default):
+    try:
+        return int(os.getenv(name, default))
+    except (TypeError, ValueError):
+        return default
+
+
+WORKER_POOL_SIZE = _env_int("WORKER_POOL_SIZE", 8)
+# Capacity of EACH priority level: the total backlog is up to
+# len(PRIORITY_NAMES) * WORKER_QUEUE_SIZE tasks (768 by default).
+WORKER_QUEUE_SIZE = _env_int("WORKER_QUEUE_SIZE", 256)
+
+# Task priorities, most urgent first.
+PRIORITY_HIGH = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = ("high", "normal", "bulk")
+# Seconds of waiting that promote a queued task by one priority level.
+WORKER_PRIORITY_AGING = float(os.getenv("WORKER_PRIORITY_AGING", "30"))
+
+# Max concurrent calls per pipeline stage, independent of the pool size.
+STAGE_LIMITS = {
+    "venue": _env_int("WORKER_VENUE_CONCURRENCY", 4),
+}
+
+
+class StageLimiter:
+    """Named semaphores capping how many tasks can be inside one stage at a time."""
+
+    def __init__(self, limits=None):
+        self._sems = {name: threading.BoundedSemaphore(max(1, n)) for name, n in (limits or {}).items()}
+        self._active = {name: 0 for name in self._sems}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        sem = self._sems.get(name)
+        if sem is None:
+            yield
+            return
+
+        sem.acquire()
+        with self._lock:
+            self._active[name] += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._active[name] -= 1
+            sem.release()
+
+    def active(self):
+        with self._lock:
+            return dict(self._active)
+
+
+class PriorityTaskQueue:
+    """
+    Bounded multi-level FIFO. get() serves the level whose oldest task has the
+    best effective priority, level - waited / aging, so a bulk task that has
+    waited `aging` seconds per level competes with fresh urgent work and
+    nothing starves. Every level has its own capacity: a bulk level that is
+    full never blocks higher priorities, so up to levels * capacity tasks
+    can be queued in total.
+    """
+
+    def __init__(self, levels=len(PRIORITY_NAMES), capacity=WORKER_QUEUE_SIZE, aging=WORKER_PRIORITY_AGING):
+        self.capacity = max(1, capacity)
+        self.aging = aging
+        self._levels = [deque() for _ in range(max(1, levels))]
+        self._lock = threading.Lock()
+        self._not_empty = threading.Condition(self._lock)
+        self._not_full = [threading.Condition(self._lock) for _ in self._levels]
+        self._closed = False
+
+    def _level(self, priority):
+        return min(max(0, int(priority)), len(self._levels) - 1)
+
+    def put(self, item, priority=PRIORITY_NORMAL, block=True, timeout=None):
+        """Enqueue (item, enqueued_at) at `priority`; raises queue.Full like queue.Queue.put."""
+        level = self._level(priority)
+        with self._not_full[level]:
+            if not block or timeout is not None:
+                deadline = time.monotonic() + (timeout or 0)
+            while len(self._levels[level]) >= self.capacity:
+                if not block:
+                    raise queue.Full
+                if timeout is None:
+                    self._not_full[level].wait()
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise queue.Full
+                    self._not_full[level].wait(remaining)
+            self._levels[level].append((item, time.monotonic()))
+            self._not_empty.notify()
+
+    def get(self):
+        """(item, level, enqueued_at) of the next task; None once closed and empty."""
+        with self._not_empty:
+            while True:
+                best, best_score = None, None
+                now = time.monotonic()
+                for level, tasks in enumerate(self._levels):
+                    if not tasks:
+                        continue
+                    score = level - (now - tasks[0][1]) / self.aging if self.aging > 0 else level
+                    if best is None or score < best_score:
+                        best, best_score = level, score
+                if best is not None:
+                    item, enqueued_at = self._levels[best].popleft()
+                    self._not_full[best].notify()
+                    return item, best, enqueued_at
+                if self._closed:
+                    return None
+                self._not_empty.wait()
+
+    def drain(self):
+        """Drop every queued task; returns how many there were."""
+        with self._lock:
+            dropped = sum(len(tasks) for tasks in self._levels)
+            for level, tasks in enumerate(self._levels):
+                tasks.clear()
+                self._not_full[level].notify_all()
+            return dropped
+
+    def close(self):
+        """Workers finish what is queued, then get() returns None."""
+        with self._lock:
+            self._closed = True
+            self._not_empty.notify_all()
+
+    def qsize(self, priority=None):
+        with self._lock:
+            if priority is not None:
+                return len(self._levels[self._level(priority)])
+            return sum(len(tasks) for tasks in self._levels)
+
+
+class BoundedWorkerPool:
+    """
+    Fixed number of worker threads fed from a bounded priority queue.
+    When the queue (for that priority) is full, submit() blocks (or gives up
+    after timeout) instead of spawning more threads. queue_size is per
+    priority level, not a total.
+    """
+
+    def __init__(self, size=WORKER_POOL_SIZE, queue_size=WORKER_QUEUE_SIZE, stage_limits=None, name="pool"):
+        self.size = max(1, size)
+        self.name = name
+        self.stages = StageLimiter(STAGE_LIMITS if stage_limits is None else stage_limits)
+
+        self._queue = PriorityTaskQueue(capacity=queue_size)
+        self._threads = []
+        self._in_flight = 0
+        self._completed = 0
+        self._failed = 0
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        for level, priority in enumerate(PRIORITY_NAMES):
+            metrics.gauge("queue_depth", lambda level=level: self._queue.qsize(level), pool=self.name, priority=priority)
+        metrics.gauge("in_flight", lambda: self.in_flight, pool=self.name)
+        for i in range(self.size):
+            t = threading.Thread(target=self._worker_loop, name=f"{self.name}-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def submit(self, fn, *args, block=True, timeout=None, priority=PRIORITY_NORMAL):
+        """
+        Queue fn(*args) at `priority`. Returns False when the queue stayed full
+        (block=False or timeout expired) so the caller can defer the work.
+        """
+        if not self._running:
+            raise RuntimeError(f"{self.name} is not running")
+        try:
+            self._queue.put((fn, args), priority=priority, block=block, timeout=timeout)
+            return True
+        except queue.Full:
+            return False
+
+    def stage(self, name):
+        return self.stages.stage(name)
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    @property
+    def in_flight(self):
+        with self._lock:
+            return self._in_flight
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.size,
+                "queue_depth": self._queue.qsize(),
+                "queue_by_priority": {name: self._queue.qsize(level) for level, name in enumerate(PRIORITY_NAMES)},
+                "queue_capacity": self._queue.capacity,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "failed": self._failed,
+                "stages": self.stages.active(),
+            }
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        if not self._running:
+            return
+        self._running = False
+        if cancel_pending:
+            self._queue.drain()
+        self._queue.close()
+        if wait:
+            for t in self._threads:
+                t.join()
+        self._threads = []
+
+    def _worker_loop(self):
+        while True:
+            task = self._queue.get()
+            if task is None:
+                return
+
+            (fn, args), level, enqueued_at = task
+            priority = PRIORITY_NAMES[level]
+            metrics.observe("queue_wait_seconds", time.monotonic() - enqueued_at, pool=self.name, priority=priority)
+            with self._lock:
+                self._in_flight += 1
+            ok = False
+            try:
+                fn(*args)
+                ok = True
+            except Exception as e:
+                print(f" [{self.name.upper()}] Task error: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight -= 1
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+                # Enqueue -> done, i.e. what a group of this priority actually waited for.
+                metrics.observe("task_seconds", time.monotonic() - enqueued_at, pool=self.name, priority=priority)